@@ -0,0 +1,27 @@
+"""Non-blocking project file writes shared by the generator and the standalone deploy agent."""
+import asyncio
+import os
+from typing import Any, Mapping, Union
+
+import aiofiles
+import orjson
+
+
+async def write_files(targets: Mapping[Union[str, os.PathLike], Any]) -> None:
+    """Create each parent directory once, then write all files concurrently"""
+    for parent in {os.path.dirname(path) for path in targets}:
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+    await asyncio.gather(*(write_file(path, content) for path, content in targets.items()))
+
+
+async def write_file(path: Union[str, os.PathLike], content: Any) -> None:
+    """Write one generated file without blocking the event loop shared by concurrent clones"""
+    # Encoded up front and written in binary mode, skipping the TextIOWrapper encoder; orjson already
+    # produces UTF-8 bytes
+    if isinstance(content, dict):
+        data = orjson.dumps(content, option=orjson.OPT_INDENT_2)
+    else:
+        data = str(content).encode("utf-8")
+    async with aiofiles.open(path, "wb") as f:
+        await f.write(data)
@@ -0,0 +1,137 @@
+"""Gemini model registry, rate limiter and retry policy shared by the analyzer and generator agents.
+
+genai.configure mutates process-wide state and every GenerativeModel carries its own client, so
+models are configured and built once per API key and handed to every agent instance.
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+import google.generativeai as genai
+from aiolimiter import AsyncLimiter
+from google.api_core import exceptions as google_exceptions
+from tenacity import AsyncRetrying, retry_if_exception_type, stop_after_attempt, wait_exponential_jitter
+
+# Tried in order; the first model that initializes is used for both vision and code generation
+MODEL_FALLBACKS = ('gemini-2.0-flash', 'gemini-pro-vision', 'gemini-pro')
+
+# Transient Gemini failures (429 quota, 5xx, timeouts) worth retrying; anything else is terminal
+RETRYABLE_GEMINI_ERRORS = (
+    google_exceptions.ResourceExhausted,
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.DeadlineExceeded,
+    google_exceptions.InternalServerError,
+    asyncio.TimeoutError
+)
+GEMINI_MAX_ATTEMPTS = 3
+
+# Rough prompt token estimate (~4 characters per token); Gemini bills each image as a fixed 258 tokens
+CHARS_PER_TOKEN = 4
+IMAGE_TOKEN_ESTIMATE = 258
+
+# After a 429 the limiter spends two RPM tokens per call, halving throughput, for this long
+THROTTLE_SECONDS = 30
+
+logger = logging.getLogger("GeminiModels")
+
+_MODELS: Dict[Tuple[str, Tuple[str, ...]], Optional["genai.GenerativeModel"]] = {}
+_LIMITERS: Dict[Tuple[int, int], "GeminiLimiter"] = {}
+_configured_key: Optional[str] = None
+_lock = threading.Lock()
+
+
+def get_model(api_key: str, names: Tuple[str, ...] = MODEL_FALLBACKS) -> Optional["genai.GenerativeModel"]:
+    """Shared model for api_key, or None when no candidate could be initialized"""
+    global _configured_key
+    key = (api_key, names)
+    with _lock:
+        if key in _MODELS:
+            return _MODELS[key]
+        if _configured_key != api_key:
+            genai.configure(api_key=api_key)
+            _configured_key = api_key
+
+        model = None
+        for name in names:
+            try:
+                model = genai.GenerativeModel(name)
+                logger.info(f"Successfully initialized {name} model")
+                break
+            except Exception as e:
+                logger.warning(f"Failed to initialize {name}: {e}")
+        if model is None:
+            logger.error("Failed to initialize any Gemini model")
+        _MODELS[key] = model
+        return model
+
+
+def estimate_tokens(contents) -> int:
+    """Approximate prompt size of a string or a list of prompt parts"""
+    if isinstance(contents, str):
+        return len(contents) // CHARS_PER_TOKEN + 1
+    return sum(
+        len(part) // CHARS_PER_TOKEN + 1 if isinstance(part, str) else IMAGE_TOKEN_ESTIMATE
+        for part in contents
+    )
+
+
+class GeminiLimiter:
+    """Client-side RPM and TPM token buckets, so bursts of clones queue here instead of thrashing on 429s"""
+
+    def __init__(self, rpm: int, tpm: int):
+        self._rpm = AsyncLimiter(rpm, 60)
+        self._tpm = AsyncLimiter(tpm, 60)
+        self._throttled_until = 0.0
+
+    async def acquire(self, contents) -> None:
+        await self._rpm.acquire()
+        if time.monotonic() < self._throttled_until:
+            await self._rpm.acquire()
+        # A single oversized prompt may take the whole bucket but never more, or acquire() would raise
+        await self._tpm.acquire(min(estimate_tokens(contents), self._tpm.max_rate))
+
+    def throttle(self) -> None:
+        """Back off after the server reported quota exhaustion"""
+        self._throttled_until = time.monotonic() + THROTTLE_SECONDS
+
+
+def _worker_count() -> int:
+    """Server processes sharing the project quota, from WEB_CONCURRENCY (exported by main.py)"""
+    try:
+        return max(1, int(os.getenv("WEB_CONCURRENCY", "1")))
+    except ValueError:
+        return 1
+
+
+def get_limiter(rpm: int, tpm: int) -> GeminiLimiter:
+    """Limiter for this process's share of a project-wide rpm/tpm quota.
+
+    Buckets cannot be shared across worker processes, so each worker gets an equal slice of the
+    quota; together they stay within what the API project allows.
+    """
+    key = (rpm, tpm)
+    with _lock:
+        if key not in _LIMITERS:
+            workers = _worker_count()
+            _LIMITERS[key] = GeminiLimiter(max(1, rpm // workers), max(1, tpm // workers))
+        return _LIMITERS[key]
+
+
+def gemini_retrying(log: logging.Logger, limiter: Optional[GeminiLimiter] = None) -> AsyncRetrying:
+    """Exponential backoff with jitter so concurrent requests hitting a 429 do not retry in lockstep"""
+    def before_sleep(state):
+        error = state.outcome.exception()
+        if limiter is not None and isinstance(error, google_exceptions.ResourceExhausted):
+            limiter.throttle()
+        log.warning(f"Transient Gemini error, retrying in {state.next_action.sleep:.1f}s: {error}")
+
+    return AsyncRetrying(
+        retry=retry_if_exception_type(RETRYABLE_GEMINI_ERRORS),
+        wait=wait_exponential_jitter(initial=1, max=8),
+        stop=stop_after_attempt(GEMINI_MAX_ATTEMPTS),
+        before_sleep=before_sleep,
+        reraise=True
+    )
@@ -0,0 +1,39 @@
+"""Balanced-brace JSON extraction for model replies that wrap the object in prose or code fences.
+
+Shared by the analyzer agent and the standalone enhanced pipeline so both recover the same object.
+"""
+import re
+from typing import Optional
+
+# Characters that change the nesting/string state of a JSON document
+_JSON_STRUCTURE = re.compile(r'[{}"\\]')
+
+
+def extract_json_object(text: str) -> Optional[str]:
+    """Return the first balanced top-level {...} in text, honouring string literals and escapes"""
+    start = text.find('{')
+    if start == -1:
+        return None
+
+    depth = 0
+    in_string = False
+    escaped_pos = -1
+    for match in _JSON_STRUCTURE.finditer(text, start):
+        pos = match.start()
+        if pos == escaped_pos:
+            continue
+        char = match.group()
+        if in_string:
+            if char == '\\':
+                escaped_pos = pos + 1
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char == '{':
+            depth += 1
+        elif char == '}':
+            depth -= 1
+            if depth == 0:
+                return text[start:pos + 1]
+    return None
@@ -0,0 +1,43 @@
+"""Exact-match cache of Gemini results shared by the analyzer and generator agents.
+
+Keys are a sha256 over a namespace, the target framework and every prompt input (text and image
+bytes), so a repeat clone of the same page skips the API round-trip and its RPM/TPM cost. Entries
+persist under output_dir/prompt_cache, survive restarts and expire after the TTL given to set().
+"""
+import hashlib
+import os
+import threading
+from typing import Any, Dict, Optional, Union
+
+import diskcache
+
+# Directory under output_dir holding cached Gemini results
+PROMPT_CACHE_DIR = "prompt_cache"
+
+_stores: Dict[str, diskcache.Cache] = {}
+_lock = threading.Lock()
+
+
+class PromptCache:
+    def __init__(self, output_dir: str):
+        directory = os.path.join(output_dir, PROMPT_CACHE_DIR)
+        with _lock:
+            if directory not in _stores:
+                _stores[directory] = diskcache.Cache(directory)
+            self._store = _stores[directory]
+
+    @staticmethod
+    def key(namespace: str, framework: str, *parts: Union[str, bytes]) -> str:
+        digest = hashlib.sha256()
+        for part in (namespace, framework, *parts):
+            data = part.encode() if isinstance(part, str) else part
+            # Length-prefix each part so ("ab", "c") and ("a", "bc") hash differently
+            digest.update(len(data).to_bytes(8, 'little'))
+            digest.update(data)
+        return f"{namespace}:{digest.hexdigest()}"
+
+    def get(self, key: str) -> Optional[Any]:
+        return self._store.get(key)
+
+    def set(self, key: str, value: Any, expire: Optional[float] = None) -> None:
+        self._store.set(key, value, expire=expire)
@@ -0,0 +1,34 @@
+"""Regex engines for the HTML scans.
+
+RE2 (linear-time DFA, via google-re2) runs plain patterns; PCRE2 with JIT (via pcre2) runs the
+lookahead scanners RE2 cannot express. Either falls back to stdlib re when not installed.
+"""
+import re as _stdlib_re
+
+try:
+    import re2 as re
+    RE2_AVAILABLE = True
+except ImportError:
+    re = _stdlib_re
+    RE2_AVAILABLE = False
+
+try:
+    import pcre2
+    PCRE2_AVAILABLE = True
+except ImportError:
+    pcre2 = None
+    PCRE2_AVAILABLE = False
+
+
+def compile_ignorecase(pattern: str):
+    # re2 has no flag constants, so case-insensitivity is set inline for both engines
+    return re.compile('(?i)' + pattern)
+
+
+def compile_lookaround(pattern: str, ignorecase: bool = False):
+    if ignorecase:
+        pattern = '(?i)' + pattern
+    if PCRE2_AVAILABLE:
+        # JIT-compiled to native code; same match semantics as re for these patterns
+        return pcre2.compile(pattern, jit=True)
+    return _stdlib_re.compile(pattern)
@@ -1,58 +1,357 @@
 from config.system_config import SystemConfig
 import logging
-import google.generativeai as genai
+import asyncio
+import aiofiles
 import re
 import json
-from typing import Dict
+import orjson
+from typing import Dict, Optional, Tuple, Union
+from collections import OrderedDict
+import copy
+import functools
 import os
+import io
 import base64
-from bs4 import BeautifulSoup  # For HTML text extraction in fallback
-
-# Optional: Uncomment for Tesseract OCR fallback
-import pytesseract
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from selectolax.lexbor import LexborHTMLParser  # For HTML text extraction in fallback
+from agents._re_backend import compile_ignorecase, compile_lookaround
+from agents._gemini_models import get_limiter, get_model, gemini_retrying
+from agents._json_extract import extract_json_object
+from agents._prompt_cache import PromptCache
+
+# Tesseract OCR fallback (in-process libtesseract binding)
+import tesserocr
+import cv2
+import numpy as np
 from PIL import Image
 
+FRAMEWORK_INDICATORS = {
+    "frameworks": {
+        "react": ["react", "_react", "jsx", "data-reactroot", "__REACT_DEVTOOLS"],
+        "vue": ["vue", "_vue", "v-", "@click", "data-v-"],
+        "angular": ["ng-", "[ng", "angular", "_angular"],
+        "next": ["_next", "__next", "next.js"],
+        "nuxt": ["_nuxt", "__nuxt", "nuxt.js"],
+        "svelte": ["svelte", "_svelte"]
+    },
+    "css_frameworks": {
+        "bootstrap": ["bootstrap", "btn-", "col-", "container-fluid"],
+        "tailwind": ["tailwind", "tw-", "text-", "bg-", "flex", "grid"],
+        "material-ui": ["mui", "material-ui", "makeStyles"],
+        "chakra": ["chakra-ui", "css-"]
+    },
+    "cms": {
+        "wordpress": ["wp-content", "wordpress", "wp-"],
+        "shopify": ["shopify", "liquid", "theme_id"]
+    }
+}
+
+
+def _compile_indicators(indicators) -> "re.Pattern":
+    """Case-insensitive alternation over indicators, longest first so the most specific one reports"""
+    # The lookahead lets finditer report overlapping hits (e.g. "data-v-" inside "data-v-app")
+    return compile_lookaround(
+        "(?=(" + "|".join(re.escape(i) for i in sorted(indicators, key=len, reverse=True)) + "))",
+        ignorecase=True
+    )
+
+
+# Per category: lowercased indicator -> framework; matched case-insensitively so the HTML is never copied
+_INDICATOR_OWNERS = {
+    category: {
+        indicator.lower(): framework
+        for framework, indicators in frameworks.items()
+        for indicator in indicators
+    }
+    for category, frameworks in FRAMEWORK_INDICATORS.items()
+}
+
+# One scanner per category; the prompts list every detected framework, so each category is scanned
+# until all of its members have matched rather than stopping at the first hit
+_CATEGORY_SCANNERS = {
+    category: _compile_indicators(owners) for category, owners in _INDICATOR_OWNERS.items()
+}
+
+# Candidate patterns for pulling a JSON object out of a Gemini response, most specific first
+JSON_PATTERNS = [
+    re.compile(pattern, re.DOTALL) for pattern in (
+        r'```json\s*(\{[\s\S]*?\})\s*```',
+        r'```\s*(\{[\s\S]*?\})\s*```',
+        r'(\{[\s\S]*?\})\s*$',
+        r'\{[\s\S]*\}'
+    )
+]
+
+# Standard LogRecord attributes; anything else on a record came in through extra=
+RESERVED_LOG_ATTRS = frozenset({
+    'asctime', 'name', 'levelname', 'message', 'levelno', 'pathname',
+    'filename', 'module', 'exc_info', 'exc_text', 'stack_info',
+    'created', 'msecs', 'relativeCreated', 'thread', 'threadName',
+    'processName', 'process', 'msg', 'args', 'funcName', 'lineno'
+})
+
+
+class ExtraFormatter(logging.Formatter):
+    """Formatter that appends fields passed through extra= as JSON"""
+    __slots__ = ()
+
+    def formatMessage(self, record):
+        # Only records that reach a handler get here; serialize their extras once and
+        # reuse the text for every other handler formatting the same record
+        extra_text = record.__dict__.get('extra_text')
+        if extra_text is None:
+            extra_fields = {k: v for k, v in record.__dict__.items() if k not in RESERVED_LOG_ATTRS}
+            extra_text = f" | Extra: {orjson.dumps(extra_fields, default=str).decode()}" if extra_fields else ""
+            record.extra_text = extra_text
+        return super().formatMessage(record) + extra_text
+
+
+# Number of parsed Gemini analyses kept for identical screenshot + HTML inputs
+ANALYSIS_CACHE_SIZE = 256
+
+# Part of every persisted analysis key; bump whenever the analysis prompts or their parsing change
+ANALYSIS_PROMPT_VERSION = "1"
+
+# Tesseract runs in-process through tesserocr. Each OCR worker thread keeps its own
+# PyTessBaseAPI (not thread-safe) so the language model is loaded once per thread, not per call
+OCR_EXECUTOR = ThreadPoolExecutor(max_workers=os.cpu_count() or 1, thread_name_prefix="ocr")
+_TESSERACT = threading.local()
+
+
+def _tesseract_api() -> "tesserocr.PyTessBaseAPI":
+    api = getattr(_TESSERACT, "api", None)
+    if api is None:
+        api = tesserocr.PyTessBaseAPI(psm=tesserocr.PSM.AUTO)
+        _TESSERACT.api = api
+    return api
+
+
+# Placeholder text per landmark, kept when neither the HTML nor OCR yields anything better
+TEXT_PLACEHOLDERS = {
+    "header": "Welcome to Our Site",
+    "main": "Main Content",
+    "footer": "Copyright 2025"
+}
+
+# Vertical band (fraction of screenshot height) OCR'd for each landmark
+OCR_REGIONS = {
+    "header": (0.0, 0.3),
+    "main": (0.3, 0.7),
+    "footer": (0.7, 1.0)
+}
+
+
+def _ocr_regions(image: Union[str, bytes], regions: list) -> Dict[str, str]:
+    """OCR only the requested landmark bands, keeping the first substantial line of each"""
+    # Decode straight to 8-bit grayscale and hand Tesseract the raw buffer, no PIL round-trip
+    if isinstance(image, bytes):
+        gray = cv2.imdecode(np.frombuffer(image, np.uint8), cv2.IMREAD_GRAYSCALE)
+    else:
+        gray = cv2.imread(image, cv2.IMREAD_GRAYSCALE)
+    if gray is None:
+        raise ValueError("Could not decode screenshot for OCR")
+    height, width = gray.shape
+    api = _tesseract_api()
+    api.SetImageBytes(gray.tobytes(), width, height, 1, width)
+
+    texts = {}
+    for region in regions:
+        top, bottom = OCR_REGIONS[region]
+        api.SetRectangle(0, int(height * top), width, int(height * (bottom - top)))
+        for line in api.GetUTF8Text().splitlines():
+            line = line.strip()
+            if len(line) > 5:
+                # Later lines in a band are usually smaller print or OCR noise
+                texts[region] = line[:100]
+                break
+    return texts
+
+# The colour/typography/component scans are independent reads of the same HTML; with the RE2 and
+# PCRE2 backends the matching runs in native code, so the three can overlap on separate threads
+HTML_SCAN_EXECUTOR = ThreadPoolExecutor(max_workers=3, thread_name_prefix="html-scan")
+
+# Upper bound on HTML handed to the HTML parser in the fallback path, plus the tail parsed for footers
+FALLBACK_PARSE_CHARS = 200_000
+FALLBACK_FOOTER_CHARS = 50_000
+
+
+# Static sections of the rule-based (fallback / text-parsed) analyses. Each call builds fresh literals,
+# which is cheaper than deep-copying shared templates and keeps results independent of one another
+def _default_layout() -> Dict:
+    return {
+        "type": "flexbox",
+        "structure": "header-main-footer",
+        "breakpoints": ["sm:640px", "md:768px", "lg:1024px", "xl:1280px"],
+        "component_hierarchy": ["Header", "Main", "Footer"]
+    }
+
+
+def _default_colors() -> Dict:
+    return {
+        "primary": "#3b82f6",
+        "secondary": "#f8fafc",
+        "accent": "#10b981",
+        "background": "#ffffff",
+        "text": "#111827"
+    }
+
+
+def _default_typography() -> Dict:
+    return {
+        "primary_font": "system-ui",
+        "font_sizes": ["14px", "16px", "18px", "24px", "32px"],
+        "font_weights": [400, 500, 600, 700],
+        "line_heights": ["1.4", "1.6", "1.8"]
+    }
+
+
+def _default_interactive_elements() -> Dict:
+    return {
+        "navigation": ["hamburger"],
+        "buttons": ["primary"],
+        "forms": ["text-input"],
+        "animations": ["fade"]
+    }
+
+
+def _default_content_structure(text_content: Dict) -> Dict:
+    return {
+        "sections": ["hero", "main", "footer"],
+        "text_hierarchy": ["h1", "h2", "p"],
+        "images": ["hero-bg", "content-images"],
+        "icons": ["fontawesome"],
+        "text_content": text_content
+    }
+
+
+def _default_cloning_files() -> Dict:
+    return {
+        "component_files": ["components/Header.html", "components/Main.html", "components/Footer.html"],
+        "pages": ["index.html"],
+        "styles": ["style.css"],
+        "config_files": {"package.json": {}},
+        "assets": ["images/", "icons/", "fonts/"],
+        "performance_tips": ["lazy-loading", "image-optimization"]
+    }
+
+
+def _default_package_json(description: str = "Cloned website") -> Dict:
+    return {
+        "name": "cloned-website",
+        "version": "1.0.0",
+        "description": description,
+        "scripts": {"start": "live-server", "build": "echo 'No build step required'"},
+        "dependencies": {},
+        "devDependencies": {"live-server": "^1.2.2"}
+    }
+
+
+# Landmark lookups for the fallback path: the semantic tag wins, else the first element whose class matches
+LANDMARK_SELECTORS = {
+    "header": ("header", "[class*=header i]"),
+    "main": ("main", "[class*=main i], [class*=content i]"),
+    "footer": ("footer", "[class*=footer i]")
+}
+
+# Fallback-path scans below use RE2 when available.
+
+# CSS color declarations and literals scraped from raw HTML in the fallback path, in one pass
+_COLOR_RE = compile_ignorecase(
+    r'(?P<prop>(?:background-|border-)?color:\s*([#\w]+))'
+    r'|(?P<hex>#[0-9a-fA-F]{3,6})'
+    r'|(?P<rgb>rgba?\(\s*(\d+)\s*,\s*(\d+)\s*,\s*(\d+)\s*(?:,\s*[\d.]+\s*)?\))'
+)
+
+# Typography declarations in one pass; the named group that matched says which property it was.
+# font-family stops at tag/rule boundaries so an unterminated inline style cannot swallow the page
+_TYPOGRAPHY_RE = compile_ignorecase(
+    r'font-family:\s*(?P<family>[^;<>{}]+)'
+    r'|font-size:\s*(?P<size>\d+(?:px|em|rem|%))'
+    r'|font-weight:\s*(?P<weight>\d+)'
+    r'|line-height:\s*(?P<line_height>[\d.]+)'
+)
+
+# Component -> markup indicators. "class.*x" / "id.*x" mean x appears inside a class / id attribute
+# value; anything else is a literal (case-insensitive) substring of the page
+COMPONENT_INDICATORS = {
+    "header": ["<header", "class.*header", "id.*header"],
+    "navigation": ["<nav", "class.*nav", "navbar", "menu"],
+    "hero": ["class.*hero", "class.*banner", "class.*jumbotron"],
+    "main": ["<main", "class.*main", "id.*main"],
+    "content": ["class.*content", "class.*article"],
+    "sidebar": ["class.*sidebar", "class.*aside", "<aside"],
+    "footer": ["<footer", "class.*footer", "id.*footer"],
+    "card": ["class.*card", "class.*tile"],
+    "form": ["<form", "class.*form"],
+    "button": ["<button", "class.*btn"],
+    "modal": ["class.*modal", "class.*popup"],
+    "carousel": ["class.*carousel", "class.*slider"],
+    "gallery": ["class.*gallery", "class.*grid"]
+}
+
+# Landmarks every generated site gets, whether or not the HTML shows them
+BASIC_COMPONENTS = ("header", "main", "footer")
+
+# Split the indicators into literal substrings and per-attribute words
+_LITERAL_OWNERS: Dict[str, str] = {}
+_ATTRIBUTE_WORDS: Dict[str, list] = {"class": [], "id": []}
+for _component, _indicators in COMPONENT_INDICATORS.items():
+    for _indicator in _indicators:
+        _attribute, _, _word = _indicator.rpartition('.*')
+        if _attribute:
+            _ATTRIBUTE_WORDS[_attribute].append((_word, _component))
+        else:
+            _LITERAL_OWNERS[_indicator] = _component
+
+# One pass over the page finds both literal indicators and class/id attribute values. Attribute
+# values are bounded by their quotes, so nothing here can backtrack across the document
+_COMPONENT_RE = compile_ignorecase(
+    "(?P<literal>" + "|".join(re.escape(literal) for literal in sorted(_LITERAL_OWNERS, key=len, reverse=True)) + ")"
+    r"""|\b(?P<attribute>class|id)\s*=\s*(?:"(?P<dq>[^"]*)"|'(?P<sq>[^']*)'|(?P<bare>[^\s>]+))"""
+)
+
+# Longest edge (px) of the screenshot sent to Gemini; vision tokens scale with pixel count
+MAX_IMAGE_EDGE = 1568
+
 class AnalyzerAgent:
+    # Configured once; later instances reuse the same handlers instead of reopening the log file
+    _LOGGER: Optional[logging.Logger] = None
+
+    _FRAMEWORK_PKGS = {
+        "react": ("react", "react-dom"),
+        "next": ("next", "react", "react-dom"),
+        "vue": ("vue",),
+        "angular": ("@angular/core", "@angular/common"),
+        "vanilla": ("live-server",)
+    }
+    _CSS_PKGS = {
+        "tailwind": ("tailwindcss", "autoprefixer", "postcss"),
+        "bootstrap": ("bootstrap",)
+    }
+
+    # Shared across instances so repeat analyses skip the Gemini round-trip
+    _analysis_cache: "OrderedDict[str, Dict]" = OrderedDict()
+
     def __init__(self, config: SystemConfig):
         self.config = config
         self.logger = self._setup_logger()
+        self._gemini_semaphore = asyncio.Semaphore(config.gemini_concurrency or 10)
+        self._gemini_limiter = get_limiter(config.gemini_rpm, config.gemini_tpm)
+        # Persistent tier behind _analysis_cache; survives restarts and is shared with the generator
+        self._prompt_cache = PromptCache(config.output_dir)
         if config.gemini_api_key:
             self.logger.info("Using Gemini API key for analysis")
-            genai.configure(api_key=config.gemini_api_key)
-            try:
-                self.model = genai.GenerativeModel('gemini-2.0-flash')
-                self.logger.info("Successfully initialized gemini-2.0-flash model")
-            except Exception as e:
-                self.logger.warning(f"Failed to initialize gemini-2.0-flash, trying gemini-pro: {e}")
-                try:
-                    self.model = genai.GenerativeModel('gemini-pro-vision')
-                    self.logger.info("Successfully initialized gemini-pro-vision model")
-                except Exception as e2:
-                    self.logger.error(f"Failed to initialize gemini-pro-vision: {e2}")
-                    try:
-                        self.model = genai.GenerativeModel('gemini-pro')
-                        self.logger.warning("Using gemini-pro (text-only) as fallback")
-                    except Exception as e3:
-                        self.logger.error(f"Failed to initialize any Gemini model: {e3}")
-                        self.model = None
+            self.model = get_model(config.gemini_api_key)
         else:
             self.model = None
             self.logger.warning("No Gemini API key provided, using fallback analysis")
+        # Cached analyses are only valid for the model that produced them (get_model may fall back)
+        self._model_name = getattr(self.model, "model_name", "")
 
     def _setup_logger(self):
-        class ExtraFormatter(logging.Formatter):
-            def format(self, record):
-                extra_fields = {k: v for k, v in record.__dict__.items() if k not in [
-                    'asctime', 'name', 'levelname', 'message', 'levelno', 'pathname',
-                    'filename', 'module', 'exc_info', 'exc_text', 'stack_info',
-                    'created', 'msecs', 'relativeCreated', 'thread', 'threadName',
-                    'processName', 'process', 'msg', 'args', 'funcName', 'lineno'
-                ]}
-                if extra_fields:
-                    record.message = f"{record.msg} | Extra: {json.dumps(extra_fields, default=str)}"
-                else:
-                    record.message = record.msg
-                return super().format(record)
+        if AnalyzerAgent._LOGGER is not None:
+            return AnalyzerAgent._LOGGER
 
         logger = logging.getLogger(self.__class__.__name__)
         logger.setLevel(logging.DEBUG)
@@ -60,65 +359,81 @@ class AnalyzerAgent:
         for handler in logger.handlers[:]:
             logger.removeHandler(handler)
 
+        formatter = ExtraFormatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
         stream_handler = logging.StreamHandler()
-        stream_handler.setFormatter(ExtraFormatter(
-            '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-        ))
+        stream_handler.setFormatter(formatter)
         logger.addHandler(stream_handler)
 
         file_handler = logging.FileHandler('analyzer_agent.log', encoding='utf-8')
-        file_handler.setFormatter(ExtraFormatter(
-            '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-        ))
+        file_handler.setFormatter(formatter)
         logger.addHandler(file_handler)
 
+        AnalyzerAgent._LOGGER = logger
         return logger
 
     def _detect_framework_from_html(self, html_content: str) -> Dict:
-        frameworks = {
-            "react": ["react", "_react", "jsx", "data-reactroot", "__REACT_DEVTOOLS"],
-            "vue": ["vue", "_vue", "v-", "@click", "data-v-"],
-            "angular": ["ng-", "[ng", "angular", "_angular"],
-            "next": ["_next", "__next", "next.js"],
-            "nuxt": ["_nuxt", "__nuxt", "nuxt.js"],
-            "svelte": ["svelte", "_svelte"],
-            "bootstrap": ["bootstrap", "btn-", "col-", "container-fluid"],
-            "tailwind": ["tailwind", "tw-", "text-", "bg-", "flex", "grid"],
-            "material-ui": ["mui", "material-ui", "makeStyles"],
-            "chakra": ["chakra-ui", "css-"],
-            "wordpress": ["wp-content", "wordpress", "wp-"],
-            "shopify": ["shopify", "liquid", "theme_id"]
-        }
-
-        detected = {"frameworks": [], "css_frameworks": [], "cms": []}
-        html_lower = html_content.lower()
-
-        for framework, indicators in frameworks.items():
-            for indicator in indicators:
-                if indicator in html_lower:
-                    if framework in ["react", "vue", "angular", "next", "nuxt", "svelte"]:
-                        detected["frameworks"].append(framework)
-                    elif framework in ["bootstrap", "tailwind", "material-ui", "chakra"]:
-                        detected["css_frameworks"].append(framework)
-                    elif framework in ["wordpress", "shopify"]:
-                        detected["cms"].append(framework)
+        """Detect frameworks per category, one scan per category that ends once every member has matched"""
+        detected = {}
+
+        for category, frameworks in FRAMEWORK_INDICATORS.items():
+            owners = _INDICATOR_OWNERS[category]
+            found = set()
+            for match in _CATEGORY_SCANNERS[category].finditer(html_content):
+                found.add(owners[match.group(1).lower()])
+                if len(found) == len(frameworks):
                     break
 
+            # Preserve declaration order so the first entry per category stays the preferred one
+            detected[category] = [framework for framework in frameworks if framework in found]
+
         return detected
 
-    async def analyze_screenshot(self, image_path: str, html_content: str) -> Dict:
-        self.logger.info(f"Starting analysis for image: {image_path}")
+    async def analyze_screenshot(self, image: Union[str, bytes], html_content: str) -> Dict:
+        """Analyze a screenshot given as a file path or as encoded image bytes already in memory"""
+        in_memory = isinstance(image, bytes)
+        self.logger.info(f"Starting analysis for image: {'<in-memory>' if in_memory else image}")
         self.logger.info(f"HTML content length: {len(html_content)}")
 
+        framework_hints = None
         try:
-            if not os.path.exists(image_path):
-                self.logger.error(f"Image file not found: {image_path}")
-                raise FileNotFoundError(f"Image file not found: {image_path}")
-
-            image_size = os.path.getsize(image_path)
+            if in_memory:
+                image_size = len(image)
+            else:
+                try:
+                    image_size = await asyncio.to_thread(os.path.getsize, image)
+                except OSError:
+                    self.logger.error(f"Image file not found: {image}")
+                    raise FileNotFoundError(f"Image file not found: {image}")
             self.logger.info(f"Image file size: {image_size} bytes")
 
-            framework_hints = self._detect_framework_from_html(html_content)
+            # Framework markers live in <head>/early <body>; slice once and reuse for prompts too
+            html_head = html_content[:5000]
+            # Detection runs on a worker thread while the screenshot is read from disk
+            framework_task = asyncio.create_task(
+                asyncio.to_thread(self._detect_framework_from_html, html_head)
+            )
+
+            raw_image = image if in_memory else None
+            if self.model and raw_image is None:
+                try:
+                    async with aiofiles.open(image, 'rb') as img_file:
+                        raw_image = await img_file.read()
+                except Exception as e:
+                    self.logger.error(f"Failed to read image file: {e}")
+
+            cache_key = None
+            if self.model and raw_image is not None:
+                # Looked up before the image is decoded and re-encoded, so a hit costs only the hash
+                cache_key = PromptCache.key("analysis", "", self._model_name, ANALYSIS_PROMPT_VERSION,
+                                            raw_image, html_head[:3000])
+                cached = self._get_cached_analysis(cache_key)
+                if cached is not None:
+                    framework_task.cancel()
+                    self.logger.info("Returning cached analysis for identical screenshot and HTML")
+                    return cached
+
+            framework_hints = await framework_task
             self.logger.info("Framework detection complete", extra={
                 "frameworks": framework_hints.get("frameworks", []),
                 "css_frameworks": framework_hints.get("css_frameworks", []),
@@ -127,71 +442,144 @@ class AnalyzerAgent:
 
             if not self.model:
                 self.logger.warning("No Gemini model available, using fallback analysis")
-                result = self._fallback_analysis(html_content, framework_hints)
-                self._log_analysis_result(result, "fallback")
-                return result
+                return await self._run_fallback(image, html_content, framework_hints)
+
+            if raw_image is None:
+                return await self._run_fallback(image, html_content, framework_hints)
 
             try:
-                with open(image_path, 'rb') as img_file:
-                    image_data = img_file.read()
-                self.logger.info(f"Successfully read image data: {len(image_data)} bytes")
+                image_data = await asyncio.to_thread(self._prepare_image, raw_image)
+                self.logger.info(f"Successfully prepared image data: {len(image_data)} bytes")
             except Exception as e:
-                self.logger.error(f"Failed to read image file: {e}")
-                result = self._fallback_analysis(html_content, framework_hints)
-                self._log_analysis_result(result, "fallback")
-                return result
+                self.logger.error(f"Failed to prepare image data: {e}")
+                return await self._run_fallback(image, html_content, framework_hints)
 
-            prompt = self._create_analysis_prompt(html_content, framework_hints)
+            prompt = self._create_analysis_prompt(html_head[:3000], framework_hints)
 
             try:
                 self.logger.info("Attempting vision analysis with Gemini")
-                image_part = {"mime_type": "image/png", "data": image_data}
-                response = await self.model.generate_content_async([prompt, image_part])
+                image_part = {"mime_type": "image/jpeg", "data": image_data}
+                response_text = await self._stream_json_text([prompt, image_part])
 
-                if response and response.text:
-                    self.logger.info(f"Got response from Gemini: {len(response.text)} characters")
-                    self.logger.debug(f"Raw Gemini response: {response.text[:500]}...")
-                    analysis = self._parse_gemini_response(response.text, framework_hints)
+                if response_text:
+                    self.logger.info(f"Got response from Gemini: {len(response_text)} characters")
+                    self.logger.debug(f"Raw Gemini response: {response_text[:500]}...")
+                    analysis = self._parse_gemini_response(response_text, framework_hints)
                     self._log_analysis_result(analysis, "vision")
+                    self._store_analysis(cache_key, analysis)
                     return analysis
                 else:
                     self.logger.error("Empty response from Gemini")
-                    result = self._fallback_analysis(html_content, framework_hints)
-                    self._log_analysis_result(result, "fallback")
-                    return result
+                    return await self._run_fallback(image, html_content, framework_hints)
 
             except Exception as vision_error:
                 self.logger.error(f"Vision analysis failed: {vision_error}")
                 self.logger.info("Attempting text-only analysis")
 
                 try:
-                    text_prompt = self._create_text_only_prompt(html_content, framework_hints)
-                    response = await self.model.generate_content_async(text_prompt)
-
-                    if response and response.text:
+                    # Degraded results get their own namespace so a later request still retries vision
+                    text_cache_key = PromptCache.key("analysis-text", "", self._model_name,
+                                                     ANALYSIS_PROMPT_VERSION, html_head)
+                    cached = self._get_cached_analysis(text_cache_key)
+                    if cached is not None:
+                        self.logger.info("Returning cached text-only analysis for identical HTML")
+                        return cached
+
+                    text_prompt = self._create_text_only_prompt(html_head, framework_hints)
+                    response_text = await self._stream_json_text(text_prompt)
+
+                    if response_text:
                         self.logger.info("Got response from text-only analysis")
-                        analysis = self._parse_gemini_response(response.text, framework_hints)
+                        analysis = self._parse_gemini_response(response_text, framework_hints)
                         self._log_analysis_result(analysis, "text-only")
+                        self._store_analysis(text_cache_key, analysis)
                         return analysis
                     else:
                         self.logger.error("Empty response from text-only analysis")
-                        result = self._fallback_analysis(html_content, framework_hints)
-                        self._log_analysis_result(result, "fallback")
-                        return result
+                        return await self._run_fallback(image, html_content, framework_hints)
 
                 except Exception as text_error:
                     self.logger.error(f"Text-only analysis also failed: {text_error}")
-                    result = self._fallback_analysis(html_content, framework_hints)
-                    self._log_analysis_result(result, "fallback")
-                    return result
+                    return await self._run_fallback(image, html_content, framework_hints)
 
         except Exception as e:
             self.logger.error(f"Analysis failed with error: {str(e)}")
-            result = self._fallback_analysis(html_content, framework_hints)
-            self._log_analysis_result(result, "fallback")
-            return result
+            return await self._run_fallback(image, html_content, framework_hints)
+
+    async def _run_fallback(self, image: Union[str, bytes], html_content: str, framework_hints: Dict) -> Dict:
+        text_content = self._extract_text_from_html(html_content)
+        # OCR is orders of magnitude slower than parsing, so only run it for bands the HTML missed
+        missing = [region for region, text in text_content.items() if text == TEXT_PLACEHOLDERS[region]]
+        if missing:
+            text_content.update(await self._ocr_regions_async(image, missing))
+        result = await asyncio.to_thread(self._fallback_analysis, html_content, framework_hints, text_content)
+        self._log_analysis_result(result, "fallback")
+        return result
 
-    def _create_analysis_prompt(self, html_content: str, framework_hints: Dict) -> str:
+    async def _ocr_regions_async(self, image: Union[str, bytes], regions: list) -> Dict[str, str]:
+        """Run Tesseract OCR without blocking the event loop; returns no text on failure"""
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(OCR_EXECUTOR, _ocr_regions, image, regions)
+        except Exception as e:
+            self.logger.debug(f"Tesseract OCR failed: {e}")
+            return {}
+
+    def _get_cached_analysis(self, key: str) -> Optional[Dict]:
+        cache = AnalyzerAgent._analysis_cache
+        if key not in cache:
+            stored = self._prompt_cache.get(key)
+            if stored is None:
+                return None
+            # Promote to the in-memory tier; diskcache already hands back a fresh copy
+            cache[key] = stored
+            while len(cache) > ANALYSIS_CACHE_SIZE:
+                cache.popitem(last=False)
+            return copy.deepcopy(stored)
+        cache.move_to_end(key)
+        return copy.deepcopy(cache[key])
+
+    def _store_analysis(self, key: str, analysis: Dict) -> None:
+        # Text-parsed or rule-based results are degraded; caching them would stop Gemini ever being retried
+        if analysis.get("text_parsing_used") or analysis.get("fallback"):
+            return
+        cache = AnalyzerAgent._analysis_cache
+        cache[key] = copy.deepcopy(analysis)
+        cache.move_to_end(key)
+        self._prompt_cache.set(key, analysis, expire=self.config.prompt_cache_ttl_seconds)
+        while len(cache) > ANALYSIS_CACHE_SIZE:
+            cache.popitem(last=False)
+
+    def _prepare_image(self, raw_image: bytes) -> bytes:
+        """Downscale the screenshot and re-encode it as JPEG to bound vision token usage"""
+        img = Image.open(io.BytesIO(raw_image))
+        img.thumbnail((MAX_IMAGE_EDGE, MAX_IMAGE_EDGE), Image.LANCZOS)
+        buf = io.BytesIO()
+        img.convert('RGB').save(buf, 'JPEG', quality=80, optimize=True)
+        return buf.getvalue()
+
+    async def _stream_json_text(self, contents) -> str:
+        """Stream a Gemini response and stop as soon as the first JSON object closes"""
+        async for attempt in gemini_retrying(self.logger, self._gemini_limiter):
+            with attempt:
+                await self._gemini_limiter.acquire(contents)
+                async with self._gemini_semaphore:
+                    response = await self.model.generate_content_async(contents, stream=True)
+                    buf = ""
+                    async for chunk in response:
+                        try:
+                            piece = chunk.text
+                        except ValueError:
+                            # Chunks without text parts (e.g. safety metadata only)
+                            continue
+                        buf += piece
+                        if '}' in piece:
+                            json_str = extract_json_object(buf)
+                            if json_str is not None:
+                                return json_str
+                    return buf
+
+    def _create_analysis_prompt(self, html_snippet: str, framework_hints: Dict) -> str:
         return f"""
         Analyze the provided website screenshot and HTML content to generate a detailed specification for cloning the website. Extract ALL VISIBLE TEXT from the screenshot using OCR-like capabilities and map it to specific components (e.g., header, main, footer). Combine this with design elements (layout, colors, typography) from both the screenshot and HTML to produce a comprehensive cloning specification.
 
@@ -201,7 +589,7 @@ class AnalyzerAgent:
         - CMS: {framework_hints.get('cms', [])}
 
         HTML CONTENT (first 3000 chars):
-        {html_content[:3000]}
+        {html_snippet}
 
         INSTRUCTIONS:
         1. Extract all text visible in the screenshot, including headings, paragraphs, buttons, navigation items, and footer text.
@@ -287,12 +675,12 @@ class AnalyzerAgent:
         - Include exact hex codes for colors and precise typography details.
         """
 
-    def _create_text_only_prompt(self, html_content: str, framework_hints: Dict) -> str:
+    def _create_text_only_prompt(self, html_snippet: str, framework_hints: Dict) -> str:
         return f"""
         Analyze this HTML content to generate a website cloning specification. Extract all text content from the HTML and map it to components (e.g., header, main, footer). Infer design elements from HTML structure, class names, and inline styles.
 
         FRAMEWORK HINTS: {framework_hints}
-        HTML CONTENT: {html_content[:5000]}
+        HTML CONTENT: {html_snippet}
 
         Return a JSON object with the same structure as the vision analysis, including:
         - `content_structure.text_content` with extracted text mapped to components.
@@ -306,64 +694,69 @@ class AnalyzerAgent:
             return
 
         try:
-            framework_info = analysis.get("framework", {})
-            layout_info = analysis.get("layout", {})
-            components = analysis.get("components", [])
+            # Skip building the per-file extras entirely when INFO records would be dropped
+            info_enabled = self.logger.isEnabledFor(logging.INFO)
             content_structure = analysis.get("content_structure", {})
 
-            self.logger.info(f"Completed {analysis_type} analysis", extra={
-                "framework": framework_info.get("primary", "unknown"),
-                "css_framework": framework_info.get("css", "unknown"),
-                "components_count": len(components),
-                "layout_type": layout_info.get("type", "unknown"),
-                "text_content_keys": list(content_structure.get("text_content", {}).keys())
-            })
+            if info_enabled:
+                framework_info = analysis.get("framework", {})
+                layout_info = analysis.get("layout", {})
+                components = analysis.get("components", [])
+
+                self.logger.info(f"Completed {analysis_type} analysis", extra={
+                    "framework": framework_info.get("primary", "unknown"),
+                    "css_framework": framework_info.get("css", "unknown"),
+                    "components_count": len(components),
+                    "layout_type": layout_info.get("type", "unknown"),
+                    "text_content_keys": list(content_structure.get("text_content", {}).keys())
+                })
 
             cloning_req = analysis.get("cloning_requirements", {})
             if cloning_req:
-                self.logger.info("Cloning requirements found", extra={
-                    "npm_packages": cloning_req.get("npm_packages", []),
-                    "component_files": cloning_req.get("component_files", []),
-                    "pages": cloning_req.get("pages", []),
-                    "styles": cloning_req.get("styles", [])
-                })
-
-                comp_desc = cloning_req.get("components_description", {})
-                for comp_name, comp_desc_text in comp_desc.items():
-                    self.logger.info(f"Component found: {comp_name}", extra={
-                        "description": comp_desc_text[:200] + "..." if len(comp_desc_text) > 200 else comp_desc_text
+                if info_enabled:
+                    self.logger.info("Cloning requirements found", extra={
+                        "npm_packages": cloning_req.get("npm_packages", []),
+                        "component_files": cloning_req.get("component_files", []),
+                        "pages": cloning_req.get("pages", []),
+                        "styles": cloning_req.get("styles", [])
                     })
 
-                pages_desc = cloning_req.get("pages_description", {})
-                for page_name, page_desc_text in pages_desc.items():
-                    self.logger.info(f"Page found: {page_name}", extra={
-                        "description": page_desc_text[:200] + "..." if len(page_desc_text) > 200 else page_desc_text
-                    })
+                    comp_desc = cloning_req.get("components_description", {})
+                    for comp_name, comp_desc_text in comp_desc.items():
+                        self.logger.info(f"Component found: {comp_name}", extra={
+                            "description": comp_desc_text[:200] + "..." if len(comp_desc_text) > 200 else comp_desc_text
+                        })
 
-                styles_desc = cloning_req.get("styles_description", {})
-                for style_name, style_desc_text in styles_desc.items():
-                    self.logger.info(f"Style found: {style_name}", extra={
-                        "description": style_desc_text[:200] + "..." if len(style_desc_text) > 200 else style_desc_text
-                    })
+                    pages_desc = cloning_req.get("pages_description", {})
+                    for page_name, page_desc_text in pages_desc.items():
+                        self.logger.info(f"Page found: {page_name}", extra={
+                            "description": page_desc_text[:200] + "..." if len(page_desc_text) > 200 else page_desc_text
+                        })
+
+                    styles_desc = cloning_req.get("styles_description", {})
+                    for style_name, style_desc_text in styles_desc.items():
+                        self.logger.info(f"Style found: {style_name}", extra={
+                            "description": style_desc_text[:200] + "..." if len(style_desc_text) > 200 else style_desc_text
+                        })
 
                 package_json = cloning_req.get("package_json", {})
-                if package_json:
+                if not package_json:
+                    self.logger.warning("No package.json found in cloning requirements")
+                elif info_enabled:
                     self.logger.info("Package.json generated", extra={
                         "name": package_json.get("name", "unknown"),
                         "dependencies": list(package_json.get("dependencies", {}).keys()),
                         "devDependencies": list(package_json.get("devDependencies", {}).keys())
                     })
-                else:
-                    self.logger.warning("No package.json found in cloning requirements")
 
                 text_content = content_structure.get("text_content", {})
-                if text_content:
+                if not text_content:
+                    self.logger.warning("No text content extracted")
+                elif info_enabled:
                     self.logger.info("Text content extracted", extra={
                         "components_with_text": list(text_content.keys()),
                         "sample_text": {k: v[:50] + "..." if len(v) > 50 else v for k, v in text_content.items()}
                     })
-                else:
-                    self.logger.warning("No text content extracted")
 
         except Exception as e:
             self.logger.error(f"Error logging analysis result: {e}")
@@ -378,25 +771,36 @@ class AnalyzerAgent:
             elif cleaned_text.startswith('```'):
                 cleaned_text = cleaned_text.replace('```', '').strip()
 
-            json_patterns = [
-                r'\{[\s\S]*\}',
-                r'(\{[\s\S]*?\})\s*$',
-                r'```json\s*(\{[\s\S]*?\})\s*```',
-                r'```\s*(\{[\s\S]*?\})\s*```'
-            ]
-
-            parsed_json = None
-            for i, pattern in enumerate(json_patterns):
-                try:
-                    match = re.search(pattern, cleaned_text, re.DOTALL)
-                    if match:
-                        json_str = match.group(1) if match.lastindex else match.group(0)
-                        parsed_json = json.loads(json_str)
-                        self.logger.info(f"Successfully parsed JSON using pattern {i}")
-                        break
-                except json.JSONDecodeError as e:
-                    self.logger.debug(f"Pattern {i} failed: {e}")
-                    continue
+            # Fast path: a well-formed response is already plain JSON once fences are stripped
+            try:
+                parsed_json = orjson.loads(cleaned_text)
+                self.logger.info("Successfully parsed JSON directly")
+            except json.JSONDecodeError:
+                parsed_json = None
+
+            if not isinstance(parsed_json, dict):
+                parsed_json = None
+                json_str = extract_json_object(cleaned_text)
+                if json_str:
+                    try:
+                        parsed_json = orjson.loads(json_str)
+                        self.logger.info("Successfully parsed JSON using bracket scan")
+                    except json.JSONDecodeError as e:
+                        self.logger.debug(f"Bracket scan failed: {e}")
+
+            if not isinstance(parsed_json, dict):
+                parsed_json = None
+                for i, pattern in enumerate(JSON_PATTERNS):
+                    try:
+                        match = pattern.search(cleaned_text)
+                        if match:
+                            json_str = match.group(1) if match.lastindex else match.group(0)
+                            parsed_json = orjson.loads(json_str)
+                            self.logger.info(f"Successfully parsed JSON using pattern {i}")
+                            break
+                    except json.JSONDecodeError as e:
+                        self.logger.debug(f"Pattern {i} failed: {e}")
+                        continue
 
             if parsed_json:
                 validated_analysis = self._validate_and_enhance_analysis(parsed_json, framework_hints)
@@ -418,21 +822,15 @@ class AnalyzerAgent:
 
         if framework_hints:
             framework = analysis.get("framework", {})
+            hinted_framework, hinted_css = self._primary_frameworks(framework_hints)
             if not framework.get("primary") or framework["primary"] == "unknown":
-                framework["primary"] = framework_hints.get("frameworks", ["vanilla"])[0]
+                framework["primary"] = hinted_framework
             if not framework.get("css") or framework["css"] == "unknown":
-                framework["css"] = framework_hints.get("css_frameworks", ["vanilla"])[0]
+                framework["css"] = hinted_css
 
         cloning_req = analysis.get("cloning_requirements", {})
         if not cloning_req.get("package_json"):
-            cloning_req["package_json"] = {
-                "name": "cloned-website",
-                "version": "1.0.0",
-                "description": "Cloned website",
-                "scripts": {"start": "live-server", "build": "echo 'No build step required'"},
-                "dependencies": {},
-                "devDependencies": {"live-server": "^1.2.2"}
-            }
+            cloning_req["package_json"] = _default_package_json()
 
         content_structure = analysis.get("content_structure", {})
         if not content_structure.get("text_content"):
@@ -464,11 +862,7 @@ class AnalyzerAgent:
     def _extract_from_text_response(self, response_text: str, framework_hints: Dict = None) -> Dict:
         self.logger.info("Attempting text extraction from response")
 
-        detected_framework = "vanilla"
-        detected_css = "vanilla"
-        if framework_hints:
-            detected_framework = framework_hints.get("frameworks", ["vanilla"])[0]
-            detected_css = framework_hints.get("css_frameworks", ["vanilla"])[0]
+        detected_framework, detected_css = self._primary_frameworks(framework_hints)
 
         text_content = {"header": "Welcome to Our Site", "main": "About Us Content", "footer": "Copyright 2025"}
         try:
@@ -492,135 +886,88 @@ class AnalyzerAgent:
                 "build_tools": ["vite"] if detected_framework != "vanilla" else [],
                 "backend_indicators": []
             },
-            "layout": {
-                "type": "flexbox",
-                "structure": "header-main-footer",
-                "breakpoints": ["sm:640px", "md:768px", "lg:1024px", "xl:1280px"],
-                "component_hierarchy": ["Header", "Main", "Footer"]
-            },
-            "colors": {
-                "primary": "#3b82f6",
-                "secondary": "#f8fafc",
-                "accent": "#10b981",
-                "background": "#ffffff",
-                "text": "#111827"
-            },
-            "typography": {
-                "primary_font": "system-ui",
-                "font_sizes": ["14px", "16px", "18px", "24px", "32px"],
-                "font_weights": [400, 500, 600, 700],
-                "line_heights": ["1.4", "1.6", "1.8"]
-            },
-            "components": ["header", "main", "footer"],
-            "interactive_elements": {
-                "navigation": ["hamburger"],
-                "buttons": ["primary"],
-                "forms": ["text-input"],
-                "animations": ["fade"]
-            },
-            "content_structure": {
-                "sections": ["hero", "main", "footer"],
-                "text_hierarchy": ["h1", "h2", "p"],
-                "text_content": text_content,
-                "images": ["hero-bg", "content-images"],
-                "icons": ["fontawesome"]
-            },
-            "cloning_requirements": {
-                "npm_packages": self._get_packages_for_framework(detected_framework, detected_css),
-                "component_files": ["components/Header.html", "components/Main.html", "components/Footer.html"],
-                "components_description": {
-                    "components/Header.html": f"Header with text '{text_content['header']}', blue background, flexbox layout",
-                    "components/Main.html": f"Main section with text '{text_content['main']}', centered content",
-                    "components/Footer.html": f"Footer with text '{text_content['footer']}', dark background"
-                },
-                "pages": ["index.html"],
-                "pages_description": {
-                    "index.html": f"Main page with header ('{text_content['header']}'), main ('{text_content['main']}'), and footer ('{text_content['footer']}')"
-                },
-                "styles": ["style.css"],
-                "styles_description": {
-                    "style.css": "Global CSS with reset, typography, layout, and component-specific styles"
-                },
-                "config_files": {"package.json": {}},
-                "assets": ["images/", "icons/", "fonts/"],
-                "performance_tips": ["lazy-loading", "image-optimization"],
-                "package_json": {
-                    "name": "cloned-website",
-                    "version": "1.0.0",
-                    "description": "Cloned website",
-                    "scripts": {"start": "live-server", "build": "echo 'No build step required'"},
-                    "dependencies": {},
-                    "devDependencies": {"live-server": "^1.2.2"}
-                }
-            },
+            "layout": _default_layout(),
+            "colors": _default_colors(),
+            "typography": _default_typography(),
+            "components": list(BASIC_COMPONENTS),
+            "interactive_elements": _default_interactive_elements(),
+            "content_structure": _default_content_structure(text_content),
+            "cloning_requirements": self._cloning_requirements(
+                detected_framework, detected_css, text_content,
+                "Global CSS with reset, typography, layout, and component-specific styles",
+                _default_package_json()
+            ),
             "raw_analysis": response_text,
             "text_parsing_used": True
         }
         return result
 
-    def _get_packages_for_framework(self, framework: str, css_framework: str) -> list:
-        base_packages = []
-        if framework == "react":
-            base_packages = ["react", "react-dom"]
-        elif framework == "next":
-            base_packages = ["next", "react", "react-dom"]
-        elif framework == "vue":
-            base_packages = ["vue"]
-        elif framework == "angular":
-            base_packages = ["@angular/core", "@angular/common"]
-        elif framework == "vanilla":
-            base_packages = ["live-server"]
-        if css_framework == "tailwind":
-            base_packages.extend(["tailwindcss", "autoprefixer", "postcss"])
-        elif css_framework == "bootstrap":
-            base_packages.append("bootstrap")
-        return base_packages or ["live-server"]
-
-    def _fallback_analysis(self, html_content: str, framework_hints: Dict = None) -> Dict:
-        self.logger.info("Using fallback analysis method")
-
-        detected_framework = "vanilla"
-        detected_css = "vanilla"
-        if framework_hints:
-            detected_framework = framework_hints.get("frameworks", ["vanilla"])[0]
-            detected_css = framework_hints.get("css_frameworks", ["vanilla"])[0]
-
-        # Extract text from HTML using BeautifulSoup
-        soup = BeautifulSoup(html_content, 'html.parser')
-        text_content = {
-            "header": "Welcome to Our Site",
-            "main": "Main Content",
-            "footer": "Copyright 2025"
+    def _primary_frameworks(self, framework_hints: Optional[Dict]) -> Tuple[str, str]:
+        """Preferred (framework, css framework) from detection hints, vanilla when none matched"""
+        if not framework_hints:
+            return "vanilla", "vanilla"
+        return (
+            (framework_hints.get("frameworks") or ["vanilla"])[0],
+            (framework_hints.get("css_frameworks") or ["vanilla"])[0]
+        )
+
+    def _cloning_requirements(self, framework: str, css_framework: str, text_content: Dict,
+                              styles_description: str, package_json: Dict) -> Dict:
+        return {
+            **_default_cloning_files(),
+            "npm_packages": self._get_packages_for_framework(framework, css_framework),
+            "components_description": {
+                "components/Header.html": f"Header with text '{text_content['header']}', blue background, flexbox layout",
+                "components/Main.html": f"Main section with text '{text_content['main']}', centered content",
+                "components/Footer.html": f"Footer with text '{text_content['footer']}', dark background"
+            },
+            "pages_description": {
+                "index.html": f"Main page with header ('{text_content['header']}'), main ('{text_content['main']}'), and footer ('{text_content['footer']}')"
+            },
+            "styles_description": {"style.css": styles_description},
+            "package_json": package_json
         }
+
+    def _get_packages_for_framework(self, framework: str, css_framework: str) -> list:
+        # Fresh list per call; the cached tuple must not be mutated by callers
+        return list(self._resolve_packages(framework, css_framework))
+
+    @staticmethod
+    @functools.lru_cache(maxsize=64)
+    def _resolve_packages(framework: str, css_framework: str) -> tuple:
+        base_packages = AnalyzerAgent._FRAMEWORK_PKGS.get(framework, ()) + AnalyzerAgent._CSS_PKGS.get(css_framework, ())
+        return base_packages or ("live-server",)
+
+    def _extract_text_from_html(self, html_content: str) -> Dict[str, str]:
+        # Extract text from HTML with lexbor (C HTML5 parser). Only a bounded slice is parsed:
+        # header/main sit near the top of the document and the footer near the end
+        tree = LexborHTMLParser(html_content[:FALLBACK_PARSE_CHARS])
+        if len(html_content) > FALLBACK_PARSE_CHARS:
+            footer_tree = LexborHTMLParser(html_content[-FALLBACK_FOOTER_CHARS:])
+        else:
+            footer_tree = tree
+        text_content = dict(TEXT_PLACEHOLDERS)
         try:
-            header = soup.find('header') or soup.find(attrs={"class": re.compile('header', re.I)})
-            if header:
-                text_content["header"] = header.get_text(strip=True)[:100] or text_content["header"]
-            main = soup.find('main') or soup.find(attrs={"class": re.compile('main|content', re.I)})
-            if main:
-                text_content["main"] = main.get_text(strip=True)[:100] or text_content["main"]
-            footer = soup.find('footer') or soup.find(attrs={"class": re.compile('footer', re.I)})
-            if footer:
-                text_content["footer"] = footer.get_text(strip=True)[:100] or text_content["footer"]
+            for region, (tag_selector, class_selector) in LANDMARK_SELECTORS.items():
+                region_tree = footer_tree if region == "footer" else tree
+                node = region_tree.css_first(tag_selector) or region_tree.css_first(class_selector)
+                if node:
+                    text_content[region] = node.text(strip=True)[:100] or text_content[region]
         except Exception as e:
             self.logger.debug(f"Failed to extract text from HTML: {e}")
+        return text_content
 
-        # Optional: Tesseract OCR fallback (uncomment if needed)
-        try:
-            img = Image.open(image_path)
-            ocr_text = pytesseract.image_to_string(img)
-            lines = ocr_text.split('\n')
-            for i, line in enumerate(lines):
-                line = line.strip()
-                if line and len(line) > 5:
-                    if i < len(lines) * 0.3:
-                        text_content["header"] = line[:100]
-                    elif i < len(lines) * 0.7:
-                        text_content["main"] = line[:100]
-                    else:
-                        text_content["footer"] = line[:100]
-        except Exception as e:
-            self.logger.debug(f"Tesseract OCR failed: {e}")
+    def _fallback_analysis(self, html_content: str, framework_hints: Dict = None, text_content: Dict = None) -> Dict:
+        self.logger.info("Using fallback analysis method")
+
+        detected_framework, detected_css = self._primary_frameworks(framework_hints)
+
+        colors_future = HTML_SCAN_EXECUTOR.submit(self._extract_colors_from_html, html_content)
+        typography_future = HTML_SCAN_EXECUTOR.submit(self._extract_typography_from_html, html_content)
+        components_future = HTML_SCAN_EXECUTOR.submit(self._detect_components_from_html, html_content)
+
+        if text_content is None:
+            text_content = self._extract_text_from_html(html_content)
 
         result = {
             "framework": {
@@ -629,86 +976,38 @@ class AnalyzerAgent:
                 "build_tools": [],
                 "backend_indicators": []
             },
-            "layout": {
-                "type": "flexbox",
-                "structure": "header-main-footer",
-                "breakpoints": ["sm:640px", "md:768px", "lg:1024px", "xl:1280px"],
-                "component_hierarchy": ["Header", "Main", "Footer"]
-            },
-            "colors": self._extract_colors_from_html(html_content),
-            "typography": self._extract_typography_from_html(html_content),
-            "components": self._detect_components_from_html(html_content),
-            "interactive_elements": {
-                "navigation": ["hamburger"],
-                "buttons": ["primary"],
-                "forms": ["text-input"],
-                "animations": ["fade"]
-            },
-            "content_structure": {
-                "sections": ["hero", "main", "footer"],
-                "text_hierarchy": ["h1", "h2", "p"],
-                "text_content": text_content,
-                "images": ["hero-bg", "content-images"],
-                "icons": ["fontawesome"]
-            },
-            "cloning_requirements": {
-                "npm_packages": self._get_packages_for_framework(detected_framework, detected_css),
-                "component_files": ["components/Header.html", "components/Main.html", "components/Footer.html"],
-                "components_description": {
-                    "components/Header.html": f"Header with text '{text_content['header']}', blue background, flexbox layout",
-                    "components/Main.html": f"Main section with text '{text_content['main']}', centered content",
-                    "components/Footer.html": f"Footer with text '{text_content['footer']}', dark background"
-                },
-                "pages": ["index.html"],
-                "pages_description": {
-                    "index.html": f"Main page with header ('{text_content['header']}'), main ('{text_content['main']}'), and footer ('{text_content['footer']}')"
-                },
-                "styles": ["style.css"],
-                "styles_description": {
-                    "style.css": "Primary stylesheet with CSS reset, typography, layout grid, and component styling"
-                },
-                "config_files": {"package.json": {}},
-                "assets": ["images/", "icons/", "fonts/"],
-                "performance_tips": ["lazy-loading", "image-optimization"],
-                "package_json": {
-                    "name": "cloned-website",
-                    "version": "1.0.0",
-                    "description": "Cloned website using fallback analysis",
-                    "scripts": {"start": "live-server", "build": "echo 'No build step required'"},
-                    "dependencies": {},
-                    "devDependencies": {"live-server": "^1.2.2"}
-                }
-            },
+            "layout": _default_layout(),
+            "colors": colors_future.result(),
+            "typography": typography_future.result(),
+            "components": components_future.result(),
+            "interactive_elements": _default_interactive_elements(),
+            "content_structure": _default_content_structure(text_content),
+            "cloning_requirements": self._cloning_requirements(
+                detected_framework, detected_css, text_content,
+                "Primary stylesheet with CSS reset, typography, layout grid, and component styling",
+                _default_package_json("Cloned website using fallback analysis")
+            ),
             "fallback": True,
             "framework_hints_applied": framework_hints or {}
         }
         return result
 
     def _extract_colors_from_html(self, html_content: str) -> Dict:
-        colors = {
-            "primary": "#3b82f6",
-            "secondary": "#f8fafc",
-            "accent": "#10b981",
-            "background": "#ffffff",
-            "text": "#111827"
-        }
-
-        color_patterns = [
-            r'color:\s*([#\w]+)',
-            r'background-color:\s*([#\w]+)',
-            r'border-color:\s*([#\w]+)',
-            r'#([0-9a-fA-F]{3,6})',
-            r'rgb\(\s*(\d+)\s*,\s*(\d+)\s*,\s*(\d+)\s*\)',
-            r'rgba\(\s*(\d+)\s*,\s*(\d+)\s*,\s*(\d+)\s*,\s*[\d.]+\s*\)'
-        ]
+        colors = _default_colors()
 
         found_colors = []
-        for pattern in color_patterns:
-            matches = re.findall(pattern, html_content, re.IGNORECASE)
-            found_colors.extend(matches)
+        for match in _COLOR_RE.finditer(html_content):
+            kind = match.lastgroup
+            if kind == 'prop':
+                found_colors.append(match.group(2))
+            elif kind == 'hex':
+                found_colors.append(match.group('hex'))
+            else:
+                red, green, blue = (min(int(match.group(i)), 255) for i in (5, 6, 7))
+                found_colors.append(f"#{red:02x}{green:02x}{blue:02x}")
 
         if found_colors:
-            unique_colors = list(set([color for color in found_colors if color.startswith('#') or color.isalnum()]))
+            unique_colors = list(dict.fromkeys(color for color in found_colors if color.startswith('#') or color.isalnum()))
             if len(unique_colors) >= 1:
                 colors["primary"] = unique_colors[0] if unique_colors[0].startswith('#') else f"#{unique_colors[0]}"
             if len(unique_colors) >= 2:
@@ -717,72 +1016,43 @@ class AnalyzerAgent:
         return colors
 
     def _extract_typography_from_html(self, html_content: str) -> Dict:
-        typography = {
-            "primary_font": "system-ui",
-            "font_sizes": ["14px", "16px", "18px", "24px", "32px"],
-            "font_weights": [400, 500, 600, 700],
-            "line_heights": ["1.4", "1.6", "1.8"]
-        }
-
-        font_patterns = [
-            r'font-family:\s*([^;]+)',
-            r'font-size:\s*(\d+(?:px|em|rem|%))',
-            r'font-weight:\s*(\d+)',
-            r'line-height:\s*([\d.]+)'
-        ]
-
-        for pattern in font_patterns:
-            matches = re.findall(pattern, html_content, re.IGNORECASE)
-            if matches:
-                if 'font-family' in pattern:
-                    typography["primary_font"] = matches[0].strip().replace('"', '').replace("'", "")
-                elif 'font-size' in pattern:
-                    sizes = [match for match in matches if match]
-                    if sizes:
-                        typography["font_sizes"] = list(set(sizes))[:5]
-                elif 'font-weight' in pattern:
-                    weights = [int(match) for match in matches if match.isdigit()]
-                    if weights:
-                        typography["font_weights"] = sorted(list(set(weights)))
-                elif 'line-height' in pattern:
-                    heights = [match for match in matches if match]
-                    if heights:
-                        typography["line_heights"] = list(set(heights))[:3]
+        typography = _default_typography()
+
+        found = {"family": [], "size": [], "weight": [], "line_height": []}
+        for match in _TYPOGRAPHY_RE.finditer(html_content):
+            found[match.lastgroup].append(match.group(match.lastgroup))
+
+        if found["family"]:
+            typography["primary_font"] = found["family"][0].strip().replace('"', '').replace("'", "")
+        sizes = [match for match in found["size"] if match]
+        if sizes:
+            typography["font_sizes"] = list(dict.fromkeys(sizes))[:5]
+        weights = [int(match) for match in found["weight"] if match.isdigit()]
+        if weights:
+            typography["font_weights"] = sorted(set(weights))
+        heights = [match for match in found["line_height"] if match]
+        if heights:
+            typography["line_heights"] = list(dict.fromkeys(heights))[:3]
 
         return typography
 
     def _detect_components_from_html(self, html_content: str) -> list:
-        components = []
-        component_indicators = {
-            "header": ["<header", "class.*header", "id.*header"],
-            "navigation": ["<nav", "class.*nav", "navbar", "menu"],
-            "hero": ["class.*hero", "class.*banner", "class.*jumbotron"],
-            "main": ["<main", "class.*main", "id.*main"],
-            "content": ["class.*content", "class.*article"],
-            "sidebar": ["class.*sidebar", "class.*aside", "<aside"],
-            "footer": ["<footer", "class.*footer", "id.*footer"],
-            "card": ["class.*card", "class.*tile"],
-            "form": ["<form", "class.*form"],
-            "button": ["<button", "class.*btn"],
-            "modal": ["class.*modal", "class.*popup"],
-            "carousel": ["class.*carousel", "class.*slider"],
-            "gallery": ["class.*gallery", "class.*grid"]
-        }
-
-        html_lower = html_content.lower()
-        for component, patterns in component_indicators.items():
-            for pattern in patterns:
-                if re.search(pattern, html_lower):
-                    if component not in components:
-                        components.append(component)
-                    break
-
-        basic_components = ["header", "main", "footer"]
-        for basic in basic_components:
-            if basic not in components:
-                components.append(basic)
+        # Header/main/footer are always reported, so the scan only has to find the rest
+        found = set(BASIC_COMPONENTS)
+        for match in _COMPONENT_RE.finditer(html_content):
+            literal = match.group('literal')
+            if literal:
+                found.add(_LITERAL_OWNERS[literal.lower()])
+            else:
+                value = (match.group('dq') or match.group('sq') or match.group('bare') or '').lower()
+                for word, component in _ATTRIBUTE_WORDS[match.group('attribute').lower()]:
+                    if word in value:
+                        found.add(component)
+            if len(found) == len(COMPONENT_INDICATORS):
+                break
 
-        return components
+        # Report in declaration order; set membership replaces the list scans
+        return [component for component in COMPONENT_INDICATORS if component in found]
 
     def get_analysis_summary(self, analysis: Dict) -> str:
         if not analysis:
@@ -793,29 +1063,33 @@ class AnalyzerAgent:
         components = analysis.get("components", [])
         text_content = analysis.get("content_structure", {}).get("text_content", {})
 
-        summary = f"""
-Website Analysis Summary:
-========================
-Framework: {framework.get('primary', 'Unknown')}
-CSS Framework: {framework.get('css', 'Unknown')}
-Layout Type: {layout.get('type', 'Unknown')}
-Components Found: {', '.join(components) if components else 'None'}
-Cloning Method: {'AI-Powered' if not analysis.get('fallback') else 'Rule-Based Fallback'}
-Extracted Text:
-- Header: {text_content.get('header', 'None')}
-- Main: {text_content.get('main', 'None')}
-- Footer: {text_content.get('footer', 'None')}
-"""
+        lines = [
+            "",
+            "Website Analysis Summary:",
+            "========================",
+            f"Framework: {framework.get('primary', 'Unknown')}",
+            f"CSS Framework: {framework.get('css', 'Unknown')}",
+            f"Layout Type: {layout.get('type', 'Unknown')}",
+            f"Components Found: {', '.join(components) if components else 'None'}",
+            f"Cloning Method: {'AI-Powered' if not analysis.get('fallback') else 'Rule-Based Fallback'}",
+            "Extracted Text:",
+            f"- Header: {text_content.get('header', 'None')}",
+            f"- Main: {text_content.get('main', 'None')}",
+            f"- Footer: {text_content.get('footer', 'None')}",
+            ""
+        ]
 
         cloning_req = analysis.get("cloning_requirements", {})
         if cloning_req:
             npm_packages = cloning_req.get("npm_packages", [])
             component_files = cloning_req.get("component_files", [])
 
-            summary += f"""
-Required Packages: {', '.join(npm_packages) if npm_packages else 'None'}
-Component Files: {len(component_files)} files
-Generated Files: {', '.join(cloning_req.get('pages', []))}
-"""
+            lines += [
+                f"Required Packages: {', '.join(npm_packages) if npm_packages else 'None'}",
+                f"Component Files: {len(component_files)} files",
+                f"Generated Files: {', '.join(cloning_req.get('pages', []))}",
+                ""
+            ]
 
-        return summary
\ No newline at end of file
+        # Built in one join rather than concatenating two f-string blocks
+        return "\n".join(lines)
\ No newline at end of file
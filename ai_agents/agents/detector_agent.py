@@ -1,45 +1,244 @@
 from config.system_config import SystemConfig
 import os
+import asyncio
+import threading
+import functools
 import cv2
-from skimage.metrics import structural_similarity as ssim
+import numpy as np
 import logging
-from typing import Dict
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple, Union
+
+# OpenCV's quality module (opencv-contrib) computes SSIM with SIMD filter kernels; without it the
+# same computation is assembled from OpenCV primitives below
+HAS_CV2_QUALITY = hasattr(cv2, "quality")
+
+# Optional OpenCL offload through SSIM-PIL; only worth the transfer cost on very large comparisons
+try:
+    import pyopencl
+    from PIL import Image
+    from SSIM_PIL import compare_ssim as opencl_compare_ssim
+except ImportError:
+    pyopencl = None
+GPU_MIN_PIXELS = 4_000_000
+
+# Gaussian-window SSIM constants (Wang et al. 2004) for 8-bit images
+SSIM_WINDOW = (11, 11)
+SSIM_SIGMA = 1.5
+SSIM_C1 = (0.01 * 255) ** 2
+SSIM_C2 = (0.03 * 255) ** 2
+
+# Screenshots are compared at this width (aspect ratio kept); SSIM cost scales with pixel count
+SSIM_WIDTH = 512
+
+# Coarse-to-fine SSIM: start at 1/2**(SSIM_PYRAMID_LEVELS-1) scale and only refine while the score is
+# within SSIM_DECISION_MARGIN of the similarity threshold; levels stop before the window outgrows the image
+SSIM_PYRAMID_LEVELS = 4
+SSIM_DECISION_MARGIN = 0.1
+SSIM_MIN_LEVEL_EDGE = 32
+
+# Scores kept for unchanged screenshot pairs, keyed by (path, mtime_ns, size) of both files plus the
+# similarity threshold, which decides the pyramid level the score is taken at
+SCORE_CACHE_SIZE = 128
+
+# Decoded grayscale pixels are stored next to each screenshot and memory-mapped on later loads
+GRAY_CACHE_SUFFIX = ".gray.npy"
+
+
+@functools.lru_cache(maxsize=None)
+def _opencl_available() -> bool:
+    """Probe once per process for a usable OpenCL device"""
+    if pyopencl is None:
+        return False
+    try:
+        return any(platform.get_devices() for platform in pyopencl.get_platforms())
+    except Exception:
+        return False
+
+
+def _native_ssim(img1, img2) -> float:
+    """Mean SSIM in float32 on OpenCV's vectorized Gaussian filters (same window as cv2.quality)"""
+    x = img1.astype(np.float32)
+    y = img2.astype(np.float32)
+    
+    mu_x = cv2.GaussianBlur(x, SSIM_WINDOW, SSIM_SIGMA)
+    mu_y = cv2.GaussianBlur(y, SSIM_WINDOW, SSIM_SIGMA)
+    mu_x_sq = mu_x * mu_x
+    mu_y_sq = mu_y * mu_y
+    mu_xy = mu_x * mu_y
+    
+    sigma_x_sq = cv2.GaussianBlur(x * x, SSIM_WINDOW, SSIM_SIGMA) - mu_x_sq
+    sigma_y_sq = cv2.GaussianBlur(y * y, SSIM_WINDOW, SSIM_SIGMA) - mu_y_sq
+    sigma_xy = cv2.GaussianBlur(x * y, SSIM_WINDOW, SSIM_SIGMA) - mu_xy
+    
+    numerator = (2 * mu_xy + SSIM_C1) * (2 * sigma_xy + SSIM_C2)
+    denominator = (mu_x_sq + mu_y_sq + SSIM_C1) * (sigma_x_sq + sigma_y_sq + SSIM_C2)
+    return float((numerator / denominator).mean())
+
+
+# Decoders that shrink while decoding, largest factor first; scoring never needs more than SSIM_WIDTH
+REDUCED_GRAY_FLAGS = ((4, cv2.IMREAD_REDUCED_GRAYSCALE_4), (2, cv2.IMREAD_REDUCED_GRAYSCALE_2))
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+
+def _gray_read_flag(header: bytes) -> int:
+    """Pick a reduced grayscale decode when the PNG is wide enough to stay at or above SSIM_WIDTH"""
+    if header[:8] != PNG_SIGNATURE or len(header) < 24:
+        return cv2.IMREAD_GRAYSCALE
+    width = int.from_bytes(header[16:20], 'big')
+    for factor, flag in REDUCED_GRAY_FLAGS:
+        if width // factor >= SSIM_WIDTH:
+            return flag
+    return cv2.IMREAD_GRAYSCALE
+
+
+def _load_gray_cached(path: str, source_mtime_ns: int):
+    """Grayscale image via a .npy sidecar when it is newer than the screenshot; None if undecodable"""
+    sidecar = path + GRAY_CACHE_SUFFIX
+    try:
+        if os.stat(sidecar).st_mtime_ns >= source_mtime_ns:
+            return np.load(sidecar, mmap_mode='r')
+    except (OSError, ValueError):
+        pass
+    
+    with open(path, 'rb') as f:
+        header = f.read(24)
+    img = cv2.imread(path, _gray_read_flag(header))
+    if img is not None:
+        try:
+            # Write then rename so a concurrent reader never maps a half-written file
+            tmp_path = f"{sidecar}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                np.save(f, img)
+            os.replace(tmp_path, sidecar)
+        except OSError:
+            pass
+    return img
+
+# A screenshot may be given as a file path, encoded image bytes (e.g. straight from
+# page.screenshot()) or an already decoded grayscale/BGR(A) array
+ScreenshotSource = Union[str, bytes, np.ndarray]
+
+
+def _load_gray(source: ScreenshotSource, mtime_ns: Optional[int]):
+    if isinstance(source, str):
+        return _load_gray_cached(source, mtime_ns)
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return cv2.imdecode(np.frombuffer(source, np.uint8), _gray_read_flag(bytes(source[:24])))
+    if source.ndim == 3:
+        code = cv2.COLOR_BGRA2GRAY if source.shape[2] == 4 else cv2.COLOR_BGR2GRAY
+        return cv2.cvtColor(source, code)
+    return source
+
+_resize_buffers = threading.local()
+
+
+def _resize_into(img, size: Tuple[int, int], slot: int):
+    """INTER_AREA resize into a per-thread scratch buffer that grows on demand and is reused across calls"""
+    width, height = size
+    buffers = getattr(_resize_buffers, 'buffers', None)
+    if buffers is None:
+        buffers = _resize_buffers.buffers = [np.empty(0, np.uint8), np.empty(0, np.uint8)]
+    if buffers[slot].size < width * height:
+        buffers[slot] = np.empty(width * height, np.uint8)
+    dst = buffers[slot][:width * height].reshape(height, width)
+    return cv2.resize(img, size, dst=dst, interpolation=cv2.INTER_AREA)
 
 class DetectorAgent:
+    _score_cache: "OrderedDict[Tuple, float]" = OrderedDict()
+    
     def __init__(self, config: SystemConfig):
         self.config = config
         self.logger = self._setup_logger()
+        self._use_gpu = _opencl_available()
     
     def _setup_logger(self):
         logging.basicConfig(level=logging.INFO)
         return logging.getLogger(self.__class__.__name__)
     
-    async def validate_similarity(self, original_screenshot: str, generated_screenshot: str) -> float:
+    def _compute_ssim(self, img1, img2) -> float:
+        if self._use_gpu and img1.size >= GPU_MIN_PIXELS:
+            try:
+                return opencl_compare_ssim(Image.fromarray(img1), Image.fromarray(img2), GPU=True)
+            except Exception as e:
+                self.logger.warning(f"OpenCL SSIM failed, using CPU: {str(e)}")
+        if HAS_CV2_QUALITY:
+            return cv2.quality.QualitySSIM_compute(img1, img2)[0][0]
+        return _native_ssim(img1, img2)
+    
+    def _multiscale_ssim(self, img1, img2) -> float:
+        pyramid = [(img1, img2)]
+        while len(pyramid) < SSIM_PYRAMID_LEVELS and min(pyramid[-1][0].shape) >= 2 * SSIM_MIN_LEVEL_EDGE:
+            coarse1, coarse2 = pyramid[-1]
+            pyramid.append((cv2.pyrDown(coarse1), cv2.pyrDown(coarse2)))
+        
+        threshold = self.config.similarity_threshold
+        for level in range(len(pyramid) - 1, -1, -1):
+            score = self._compute_ssim(*pyramid[level])
+            if level == 0 or abs(score - threshold) > SSIM_DECISION_MARGIN:
+                self.logger.debug(f"SSIM decided at pyramid level {level}")
+                return score
+    
+    async def validate_similarity(self, original_screenshot: ScreenshotSource, generated_screenshot: ScreenshotSource) -> float:
         """Calculate visual similarity using SSIM"""
+        # Blocking work (stat, decode, SSIM) runs on worker threads to keep the event loop free
         try:
-            # Check if files exist
-            if not os.path.exists(original_screenshot) or not os.path.exists(generated_screenshot):
+            # Check if files exist; in-memory screenshots skip the disk entirely
+            try:
+                original_stat, generated_stat = await asyncio.to_thread(
+                    lambda: tuple(
+                        os.stat(source) if isinstance(source, str) else None
+                        for source in (original_screenshot, generated_screenshot)
+                    )
+                )
+            except OSError:
                 self.logger.warning("Screenshot files not found for comparison")
                 return 0.5  # Default similarity score
             
-            # Load images
-            img1 = cv2.imread(original_screenshot, cv2.IMREAD_GRAYSCALE)
-            img2 = cv2.imread(generated_screenshot, cv2.IMREAD_GRAYSCALE)
+            # Only file pairs are cached; a rewritten file changes mtime or size, which invalidates the entry
+            cache_key = None
+            if original_stat and generated_stat:
+                cache_key = (
+                    original_screenshot, original_stat.st_mtime_ns, original_stat.st_size,
+                    generated_screenshot, generated_stat.st_mtime_ns, generated_stat.st_size,
+                    self.config.similarity_threshold
+                )
+                cached_score = DetectorAgent._score_cache.get(cache_key)
+                if cached_score is not None:
+                    DetectorAgent._score_cache.move_to_end(cache_key)
+                    self.logger.info(f"Similarity score (cached): {cached_score}")
+                    return cached_score
+            
+            # Load both images concurrently; reads and PNG decodes overlap since cv2 releases the GIL
+            img1, img2 = await asyncio.gather(
+                asyncio.to_thread(_load_gray, original_screenshot, original_stat and original_stat.st_mtime_ns),
+                asyncio.to_thread(_load_gray, generated_screenshot, generated_stat and generated_stat.st_mtime_ns)
+            )
             
             if img1 is None or img2 is None:
                 self.logger.error("Failed to load images for comparison")
                 return 0.5
             
-            # Resize to same dimensions
-            height, width = img1.shape
-            img2_resized = cv2.resize(img2, (width, height))
-            
-            # Calculate SSIM
-            similarity_score = ssim(img1, img2_resized)
-            
+            similarity_score = await asyncio.to_thread(self._score_images, img1, img2)
             self.logger.info(f"Similarity score: {similarity_score}")
-            return float(similarity_score)
+            
+            if cache_key is not None:
+                DetectorAgent._score_cache[cache_key] = similarity_score
+                if len(DetectorAgent._score_cache) > SCORE_CACHE_SIZE:
+                    DetectorAgent._score_cache.popitem(last=False)
+            return similarity_score
             
         except Exception as e:
             self.logger.error(f"Similarity calculation failed: {str(e)}")
             return 0.5  # Return default score on error
+    
+    def _score_images(self, img1, img2) -> float:
+        # Downsample to a common size; full-page screenshots are tall, so only the width is fixed
+        height, width = img1.shape
+        if width > SSIM_WIDTH:
+            height, width = max(1, round(height * SSIM_WIDTH / width)), SSIM_WIDTH
+            img1 = _resize_into(img1, (width, height), 0)
+        img2_resized = _resize_into(img2, (width, height), 1)
+        
+        # Calculate SSIM
+        return float(self._multiscale_ssim(img1, img2_resized))
@@ -12,7 +12,7 @@ import hashlib
 import logging
 
 # Core dependencies
-from playwright.async_api import async_playwright, Browser, Page
+from playwright.async_api import async_playwright, Browser, Page, Error as PlaywrightError
 import google.generativeai as genai
 import cv2
 import numpy as np
@@ -20,10 +20,127 @@ from skimage.metrics import structural_similarity as ssim
 import requests
 from pathlib import Path
 
+from agents._files import write_files
+from agents._json_extract import extract_json_object
+
 # FastAPI for API wrapper
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
 from typing import Dict
+
+# Static templates, built once at import instead of on every request
+_ANALYSIS_PROMPT_TEMPLATE = """
+            Analyze this website screenshot and HTML structure. Provide detailed analysis for cloning:
+
+            1. LAYOUT STRUCTURE:
+            - Header, navigation, main content, sidebar, footer sections
+            - Grid/flexbox layout patterns
+            - Responsive breakpoints
+
+            2. VISUAL COMPONENTS:
+            - Typography (fonts, sizes, weights)
+            - Color scheme (primary, secondary, accent colors)
+            - Spacing and margins
+            - Buttons, forms, cards, modals
+
+            3. INTERACTIVE ELEMENTS:
+            - Navigation menus
+            - Buttons and links
+            - Form inputs
+            - Hover states
+
+            4. CONTENT STRUCTURE:
+            - Text hierarchy
+            - Image placements
+            - Icon usage
+            - Content blocks
+
+            HTML Preview (first 2000 chars):
+            {html}
+
+            Return analysis as structured JSON with specific implementation details for React/Next.js.
+            """
+
+_GLOBAL_CSS = """
+@tailwind base;
+@tailwind components;
+@tailwind utilities;
+
+@layer base {
+  html {
+    scroll-behavior: smooth;
+  }
+  
+  body {
+    @apply text-gray-900;
+  }
+}
+
+@layer components {
+  .btn-primary {
+    @apply bg-blue-600 text-white px-6 py-3 rounded-lg font-semibold hover:bg-blue-700 transition-colors;
+  }
+  
+  .btn-secondary {
+    @apply bg-gray-200 text-gray-900 px-6 py-3 rounded-lg font-semibold hover:bg-gray-300 transition-colors;
+  }
+}
+"""
+
+_PACKAGE_JSON = json.dumps({
+    "name": "cloned-website",
+    "version": "1.0.0",
+    "private": True,
+    "scripts": {
+        "dev": "next dev",
+        "build": "next build",
+        "start": "next start",
+        "lint": "next lint"
+    },
+    "dependencies": {
+        "next": "14.0.0",
+        "react": "^18.2.0",
+        "react-dom": "^18.2.0"
+    },
+    "devDependencies": {
+        "autoprefixer": "^10.4.16",
+        "eslint": "^8.54.0",
+        "eslint-config-next": "14.0.0",
+        "postcss": "^8.4.31",
+        "tailwindcss": "^3.3.6"
+    }
+}, indent=2)
+
+_NEXT_CONFIG = """/** @type {import('next').NextConfig} */
+const nextConfig = {
+  reactStrictMode: true,
+  images: {
+    domains: ['localhost'],
+  },
+}
+
+module.exports = nextConfig
+"""
+
+_TAILWIND_CONFIG = """/** @type {import('tailwindcss').Config} */
+module.exports = {
+  content: [
+    './pages/**/*.{js,ts,jsx,tsx,mdx}',
+    './components/**/*.{js,ts,jsx,tsx,mdx}',
+    './app/**/*.{js,ts,jsx,tsx,mdx}',
+  ],
+  theme: {
+    extend: {
+      colors: {
+        primary: '#3b82f6',
+        secondary: '#f8fafc',
+      },
+    },
+  },
+  plugins: [],
+}
+"""
+
 # Configuration
 @dataclass
 class SystemConfig:
@@ -90,10 +207,10 @@ class ExplorerAgent(BaseAgent):
             # Gather page metadata
             title = await self.page.title()
             
-            # Try to get meta description safely
+            # get_attribute already yields None when the tag is missing; only a DOM detach race raises
             try:
                 meta_description = await self.page.get_attribute('meta[name="description"]', 'content') or ""
-            except:
+            except PlaywrightError:
                 meta_description = ""
             
             # Get page structure
@@ -157,37 +274,7 @@ class AnalyzerAgent(BaseAgent):
                 image_data = img_file.read()
             
             # Prepare prompt for analysis
-            prompt = f"""
-            Analyze this website screenshot and HTML structure. Provide detailed analysis for cloning:
-
-            1. LAYOUT STRUCTURE:
-            - Header, navigation, main content, sidebar, footer sections
-            - Grid/flexbox layout patterns
-            - Responsive breakpoints
-
-            2. VISUAL COMPONENTS:
-            - Typography (fonts, sizes, weights)
-            - Color scheme (primary, secondary, accent colors)
-            - Spacing and margins
-            - Buttons, forms, cards, modals
-
-            3. INTERACTIVE ELEMENTS:
-            - Navigation menus
-            - Buttons and links
-            - Form inputs
-            - Hover states
-
-            4. CONTENT STRUCTURE:
-            - Text hierarchy
-            - Image placements
-            - Icon usage
-            - Content blocks
-
-            HTML Preview (first 2000 chars):
-            {html_content[:2000]}
-
-            Return analysis as structured JSON with specific implementation details for React/Next.js.
-            """
+            prompt = _ANALYSIS_PROMPT_TEMPLATE.format(html=html_content[:2000])
             
             try:
                 response = await self.model.generate_content_async([
@@ -221,10 +308,9 @@ class AnalyzerAgent(BaseAgent):
         """Parse Gemini response into structured format"""
         try:
             # Try to extract JSON from response
-            import re
-            json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
-            if json_match:
-                return json.loads(json_match.group())
+            json_text = extract_json_object(response_text)
+            if json_text:
+                return json.loads(json_text)
             else:
                 # Fallback: create structured response from text
                 return {
@@ -513,89 +599,17 @@ export default function Footer() {
 """
     
     def _generate_global_css(self) -> str:
-        return """
-@tailwind base;
-@tailwind components;
-@tailwind utilities;
-
-@layer base {
-  html {
-    scroll-behavior: smooth;
-  }
-  
-  body {
-    @apply text-gray-900;
-  }
-}
-
-@layer components {
-  .btn-primary {
-    @apply bg-blue-600 text-white px-6 py-3 rounded-lg font-semibold hover:bg-blue-700 transition-colors;
-  }
-  
-  .btn-secondary {
-    @apply bg-gray-200 text-gray-900 px-6 py-3 rounded-lg font-semibold hover:bg-gray-300 transition-colors;
-  }
-}
-"""
+        return _GLOBAL_CSS
     
     def _generate_package_json(self) -> str:
-        return json.dumps({
-            "name": "cloned-website",
-            "version": "1.0.0",
-            "private": True,
-            "scripts": {
-                "dev": "next dev",
-                "build": "next build",
-                "start": "next start",
-                "lint": "next lint"
-            },
-            "dependencies": {
-                "next": "14.0.0",
-                "react": "^18.2.0",
-                "react-dom": "^18.2.0"
-            },
-            "devDependencies": {
-                "autoprefixer": "^10.4.16",
-                "eslint": "^8.54.0",
-                "eslint-config-next": "14.0.0",
-                "postcss": "^8.4.31",
-                "tailwindcss": "^3.3.6"
-            }
-        }, indent=2)
+        return _PACKAGE_JSON
     
     def _generate_next_config(self) -> str:
-        return """/** @type {import('next').NextConfig} */
-const nextConfig = {
-  reactStrictMode: true,
-  images: {
-    domains: ['localhost'],
-  },
-}
-
-module.exports = nextConfig
-"""
+        return _NEXT_CONFIG
     
     def _generate_tailwind_config(self) -> str:
-        return """/** @type {import('tailwindcss').Config} */
-module.exports = {
-  content: [
-    './pages/**/*.{js,ts,jsx,tsx,mdx}',
-    './components/**/*.{js,ts,jsx,tsx,mdx}',
-    './app/**/*.{js,ts,jsx,tsx,mdx}',
-  ],
-  theme: {
-    extend: {
-      colors: {
-        primary: '#3b82f6',
-        secondary: '#f8fafc',
-      },
-    },
-  },
-  plugins: [],
-}
-"""
-
+        return _TAILWIND_CONFIG
+    
 # 5. Detector Agent - Validation
 class DetectorAgent(BaseAgent):
     async def validate_similarity(self, original_screenshot: str, generated_screenshot: str) -> float:
@@ -638,15 +652,7 @@ class DeployAgent(BaseAgent):
             project_dir = Path(self.config.output_dir) / f"project_{timestamp}"
             project_dir.mkdir(parents=True, exist_ok=True)
             
-            # Write files
-            for file_path, content in code_files.items():
-                file_full_path = project_dir / file_path
-                file_full_path.parent.mkdir(parents=True, exist_ok=True)
-                
-                if isinstance(content, str):
-                    file_full_path.write_text(content)
-                else:
-                    file_full_path.write_text(json.dumps(content, indent=2))
+            await write_files({project_dir / file_path: content for file_path, content in code_files.items()})
             
             # For demo purposes, return a mock URL
             # In production, this would use Firebase CLI/API
@@ -1,65 +1,392 @@
-from config.system_config import SystemConfig
-from typing import Optional, Dict
-from playwright.async_api import async_playwright, Browser, Page
+from config.system_config import SystemConfig, WaitStrategy
+from typing import Optional, Dict, List, Tuple
+from playwright.async_api import async_playwright, Browser, BrowserContext, Page, Playwright
+from playwright.async_api import Error as PlaywrightError, Response, Route
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+from tenacity import retry, retry_if_exception, stop_after_attempt, wait_exponential_jitter
+from collections import OrderedDict
+import asyncio
+import hashlib
 import logging
-from typing import Dict
+import os
+import time
+from urllib.parse import urlsplit
+import diskcache
+from selectolax.lexbor import LexborHTMLParser
+import zstandard as zstd
+
+logging.basicConfig(level=logging.INFO)
+# An explorer is built per request; the logger lookup and basicConfig happen once per process instead
+logger = logging.getLogger("ExplorerAgent")
+
+# Upper bound on waiting for the load event once the DOM is ready (domcontentloaded strategy)
+LOAD_STATE_TIMEOUT_MS = 2000
+
+# Directory under output_dir holding navigation results shared across processes
+NAV_CACHE_DIR = "nav_cache"
+
+# Collects the page metadata and serialized DOM in a single evaluate call
+PAGE_INFO_SCRIPT = """() => ({
+  title: document.title,
+  description: (document.querySelector('meta[name="description"]') || {}).content || '',
+  html: (document.doctype ? new XMLSerializer().serializeToString(document.doctype) : '') + document.documentElement.outerHTML
+})"""
+
+# Pages navigated at once by navigate_many; they share one context and therefore one browser slot
+MAX_PARALLEL_PAGES = 8
+
+# Tag outline returned with each page is capped at this many elements
+STRUCTURE_MAX_TAGS = 5000
+
+# Analytics/ad hosts (and their subdomains) whose requests are always aborted; they never affect the clone
+TRACKER_HOSTS = frozenset({
+    "google-analytics.com", "googletagmanager.com", "doubleclick.net", "segment.io",
+    "segment.com", "hotjar.com", "facebook.net", "mixpanel.com"
+})
+
+# Cached pages keep their HTML zstd-compressed (typically 8-12x smaller); level 3 compresses at hundreds of MB/s
+HTML_ZSTD_LEVEL = 3
+
+
+def _is_tracker(url: str) -> bool:
+    host = urlsplit(url).hostname or ""
+    return any(host == tracker or host.endswith("." + tracker) for tracker in TRACKER_HOSTS)
+
+
+def _summarize_html(html: str) -> Dict:
+    """Parse once in C (lexbor) and keep only the lean fields downstream consumers need"""
+    tree = LexborHTMLParser(html)
+    body = tree.body
+    structure = []
+    if body is not None:
+        for node in body.traverse(include_text=False):
+            structure.append(node.tag)
+            if len(structure) > STRUCTURE_MAX_TAGS:
+                break
+    # Script and style bodies are not visible text
+    tree.strip_tags(["script", "style", "noscript"])
+    return {
+        "text": body.text(separator=" ", strip=True) if body is not None else "",
+        # traverse() starts at <body> itself; the outline covers its descendants
+        "structure": structure[1:STRUCTURE_MAX_TAGS + 1],
+        "html_zstd": zstd.ZstdCompressor(level=HTML_ZSTD_LEVEL).compress(html.encode()),
+    }
+
+# Navigation retries: network errors/timeouts and these statuses are transient, other 4xx are final
+RETRYABLE_STATUSES = frozenset({429, 502, 503, 504})
+NAV_MAX_ATTEMPTS = 3
+NAV_MAX_BACKOFF_SECONDS = 8
+_nav_backoff = wait_exponential_jitter(initial=0.5, max=NAV_MAX_BACKOFF_SECONDS)
+
+# Chromium network errors that can clear up on a second try; DNS failures, bad URLs, certificate
+# errors and closed pages are terminal and fail on the first attempt
+TRANSIENT_NET_ERRORS = (
+    "net::ERR_CONNECTION_",
+    "net::ERR_NETWORK_CHANGED",
+    "net::ERR_INTERNET_DISCONNECTED",
+    "net::ERR_TIMED_OUT",
+    "net::ERR_EMPTY_RESPONSE",
+    "net::ERR_HTTP2_PROTOCOL_ERROR",
+    "net::ERR_SOCKET_NOT_CONNECTED"
+)
+
+
+class _RetryableStatus(Exception):
+    def __init__(self, response: Response):
+        super().__init__(f"HTTP {response.status} from {response.url}")
+        self.response = response
+        retry_after = response.headers.get('retry-after', '')
+        self.retry_after = float(retry_after) if retry_after.isdigit() else None
+
+
+def _is_transient_nav_error(error: BaseException) -> bool:
+    if isinstance(error, (_RetryableStatus, PlaywrightTimeoutError)):
+        return True
+    return isinstance(error, PlaywrightError) and any(code in str(error) for code in TRANSIENT_NET_ERRORS)
+
+
+def _nav_wait(retry_state) -> float:
+    """Honour a numeric Retry-After from the site, otherwise jittered exponential backoff"""
+    error = retry_state.outcome.exception()
+    if isinstance(error, _RetryableStatus) and error.retry_after is not None:
+        return min(error.retry_after, NAV_MAX_BACKOFF_SECONDS)
+    return _nav_backoff(retry_state)
+
+
+def _nav_give_up(retry_state) -> Optional[Response]:
+    """Out of attempts: keep the last error page for a retryable status, re-raise anything else"""
+    error = retry_state.outcome.exception()
+    if isinstance(error, _RetryableStatus):
+        return error.response
+    raise error
+
+# Suggested client back-off when every browser slot is taken
+BROWSER_RETRY_AFTER_SECONDS = 5
+
+
+class BrowserBusyError(Exception):
+    """No browser slot became free within the caller's permit timeout"""
+    retry_after = BROWSER_RETRY_AFTER_SECONDS
+
 
 class ExplorerAgent:
+    # One Chromium per process; each agent only opens and closes its own context
+    _playwright: Optional[Playwright] = None
+    _browser_singleton: Optional[Browser] = None
+    _browser_lock = asyncio.Lock()
+    # Caps live browser contexts (~200MB each); created on first use from config.max_concurrent_browsers
+    _browser_sem: Optional[asyncio.Semaphore] = None
+    # One open diskcache per directory; agents are created per request and share it
+    _nav_stores: Dict[str, diskcache.Cache] = {}
+    # Recent navigation results, newest last: key -> (expires_at, page_data)
+    _nav_cache: "OrderedDict[str, Tuple[float, Dict]]" = OrderedDict()
+
     def __init__(self, config: SystemConfig):
         self.config = config
-        self.logger = self._setup_logger()
+        self.logger = logger
+        self._nav_store = self._nav_store_for(os.path.join(config.output_dir, NAV_CACHE_DIR))
         self.browser: Optional[Browser] = None
+        self.context: Optional[BrowserContext] = None
         self.page: Optional[Page] = None
+        self._holds_permit = False
     
-    def _setup_logger(self):
-        logging.basicConfig(level=logging.INFO)
-        return logging.getLogger(self.__class__.__name__)
+    @classmethod
+    def _nav_store_for(cls, directory: str) -> diskcache.Cache:
+        store = cls._nav_stores.get(directory)
+        if store is None:
+            store = cls._nav_stores[directory] = diskcache.Cache(directory)
+        return store
+
+    @classmethod
+    async def _shared_browser(cls) -> Browser:
+        """Launch Chromium on first use and relaunch it if it has gone away"""
+        async with cls._browser_lock:
+            if cls._browser_singleton is None or not cls._browser_singleton.is_connected():
+                if cls._playwright is None:
+                    cls._playwright = await async_playwright().start()
+                cls._browser_singleton = await cls._playwright.chromium.launch(
+                    headless=True,
+                    args=['--no-sandbox', '--disable-setuid-sandbox']
+                )
+            return cls._browser_singleton
+
+    @classmethod
+    async def startup(cls):
+        """Launch the shared browser ahead of the first request (call on process start)"""
+        await cls._shared_browser()
+
+    @classmethod
+    async def shutdown(cls):
+        """Close the shared browser and Playwright driver (call on process exit)"""
+        async with cls._browser_lock:
+            if cls._browser_singleton is not None:
+                await cls._browser_singleton.close()
+                cls._browser_singleton = None
+            if cls._playwright is not None:
+                await cls._playwright.stop()
+                cls._playwright = None
     
-    async def initialize_browser(self):
-        """Initialize Playwright browser"""
-        playwright = await async_playwright().start()
-        self.browser = await playwright.chromium.launch(
-            headless=True,
-            args=['--no-sandbox', '--disable-setuid-sandbox']
-        )
-        context = await self.browser.new_context(
-            viewport={'width': self.config.screenshot_width, 'height': self.config.screenshot_height}
-        )
-        self.page = await context.new_page()
+    async def _acquire_permit(self, permit_timeout: Optional[float]) -> None:
+        """Take a browser slot, waiting at most permit_timeout seconds (forever when None)"""
+        if ExplorerAgent._browser_sem is None:
+            ExplorerAgent._browser_sem = asyncio.Semaphore(self.config.max_concurrent_browsers)
+        try:
+            await asyncio.wait_for(ExplorerAgent._browser_sem.acquire(), permit_timeout)
+        except asyncio.TimeoutError:
+            raise BrowserBusyError(f"All {self.config.max_concurrent_browsers} browser slots are busy")
+        self._holds_permit = True
+
+    def _release_permit(self) -> None:
+        if self._holds_permit:
+            self._holds_permit = False
+            ExplorerAgent._browser_sem.release()
+
+    async def initialize_browser(self, permit_timeout: Optional[float] = None):
+        """Open a fresh context on the shared Playwright browser; the slot is held until cleanup()"""
+        await self._acquire_permit(permit_timeout)
+        try:
+            self.browser = await self._shared_browser()
+            self.context = await self.browser.new_context(
+                viewport={'width': self.config.screenshot_width, 'height': self.config.screenshot_height}
+            )
+            await self.context.route("**/*", self._route_request)
+            self.page = await self.context.new_page()
+        except Exception:
+            await self.cleanup()
+            raise
     
-    async def navigate_to_url(self, url: str) -> Dict:
-        """Navigate to URL and gather basic page info"""
+    async def _route_request(self, route: Route) -> None:
+        """Abort trackers and the configured resource types so navigation only moves the bytes the clone uses"""
+        request = route.request
+        if request.resource_type in self.config.block_resource_types or _is_tracker(request.url):
+            await route.abort()
+        else:
+            await route.continue_()
+
+    def _nav_key(self, url: str) -> str:
+        wait_strategy = WaitStrategy(self.config.wait_strategy).value
+        raw = f"{url}|{self.config.screenshot_width}x{self.config.screenshot_height}|{wait_strategy}"
+        return hashlib.blake2b(raw.encode(), digest_size=16).hexdigest()
+
+    def _get_cached_navigation(self, key: str) -> Optional[Dict]:
+        cache = ExplorerAgent._nav_cache
+        entry = cache.get(key)
+        if entry is not None:
+            expires_at, page_data = entry
+            if expires_at > time.time():
+                cache.move_to_end(key)
+                return dict(page_data)
+            del cache[key]
+        # diskcache drops expired entries itself; keep its expiry for the in-memory copy
+        page_data, expires_at = self._nav_store.get(key, expire_time=True)
+        if page_data is not None:
+            self._remember_in_memory(key, page_data, expires_at)
+            return dict(page_data)
+        return None
+
+    def _remember_in_memory(self, key: str, page_data: Dict, expires_at: float) -> None:
+        cache = ExplorerAgent._nav_cache
+        cache[key] = (expires_at, page_data)
+        cache.move_to_end(key)
+        while len(cache) > self.config.nav_cache_size:
+            cache.popitem(last=False)
+
+    def _remember_navigation(self, key: str, page_data: Dict) -> None:
+        ttl = self.config.nav_cache_ttl_seconds
+        self._remember_in_memory(key, page_data, time.time() + ttl)
+        self._nav_store.set(key, page_data, expire=ttl)
+
+    @staticmethod
+    def _shape_result(page_data: Dict, keep_raw: bool) -> Dict:
+        """Caller-facing copy of a cached entry, inflating the stored HTML only when it is wanted"""
+        result = dict(page_data)
+        html_zstd = result.pop("html_zstd", None)
+        result.pop("content_encoding", None)
+        if not keep_raw:
+            result["html_content"] = None
+        elif html_zstd is not None:
+            result["html_content"] = zstd.ZstdDecompressor().decompress(html_zstd).decode()
+        return result
+
+    def cache_screenshot(self, url: str, screenshot: bytes) -> None:
+        """Attach the captured screenshot to the cached navigation so a repeat clone skips the browser"""
+        key = self._nav_key(url)
+        page_data = self._get_cached_navigation(key)
+        if page_data is not None:
+            page_data["screenshot"] = screenshot
+            self._remember_navigation(key, page_data)
+
+    @retry(
+        retry=retry_if_exception(_is_transient_nav_error),
+        wait=_nav_wait,
+        stop=stop_after_attempt(NAV_MAX_ATTEMPTS),
+        retry_error_callback=_nav_give_up
+    )
+    async def _goto_with_retry(self, page: Page, url: str, wait_until: str) -> Optional[Response]:
+        response = await page.goto(url, wait_until=wait_until, timeout=self.config.max_wait_time)
+        if response is not None and response.status in RETRYABLE_STATUSES:
+            self.logger.warning(f"Retryable HTTP {response.status} for {url}")
+            raise _RetryableStatus(response)
+        return response
+
+    async def navigate_to_url(self, url: str, use_cache: bool = True, permit_timeout: Optional[float] = None,
+                              keep_raw: bool = True) -> Dict:
+        """Navigate to URL and gather basic page info; recent results are served from cache without a browser.
+
+        Besides the raw HTML, the result carries the body text and a tag outline parsed once here;
+        callers that only need those can pass keep_raw=False to drop html_content.
+        """
+        key = self._nav_key(url)
+        if use_cache:
+            cached = self._get_cached_navigation(key)
+            if cached is not None:
+                self.logger.info(f"Using cached navigation for {url}")
+                return self._shape_result(cached, keep_raw)
         try:
             if not self.page:
-                await self.initialize_browser()
-            
-            response = await self.page.goto(url, wait_until='networkidle', timeout=self.config.max_wait_time)
-            
-            # Gather page metadata
-            title = await self.page.title()
-            
-            # Try to get meta description safely
-            try:
-                meta_description = await self.page.get_attribute('meta[name="description"]', 'content') or ""
-            except:
-                meta_description = ""
-            
-            # Get page structure
-            html_content = await self.page.content()
-            
-            return {
-                "url": url,
-                "title": title,
-                "description": meta_description,
-                "html_content": html_content,
-                "status_code": response.status if response else None,
-                "timestamp": None
-            }
+                await self.initialize_browser(permit_timeout)
+            return await self._visit(self.page, url, key, keep_raw)
         except Exception as e:
             self.logger.error(f"Navigation failed for {url}: {str(e)}")
             raise
+
+    async def navigate_many(self, urls: List[str], use_cache: bool = True, permit_timeout: Optional[float] = None,
+                            keep_raw: bool = True) -> List[Dict]:
+        """Navigate several URLs (e.g. a site's subpages) on parallel pages of this agent's context.
+
+        Results come back in the order of urls; cached entries skip the browser as in navigate_to_url.
+        """
+        keys = [self._nav_key(url) for url in urls]
+        results: List[Optional[Dict]] = [None] * len(urls)
+        if use_cache:
+            for i, key in enumerate(keys):
+                cached = self._get_cached_navigation(key)
+                if cached is not None:
+                    results[i] = self._shape_result(cached, keep_raw)
+        pending = [i for i, result in enumerate(results) if result is None]
+        if not pending:
+            return results
+        if not self.context:
+            await self.initialize_browser(permit_timeout)
+        page_slots = asyncio.Semaphore(MAX_PARALLEL_PAGES)
+
+        async def visit_one(i: int) -> None:
+            async with page_slots:
+                page = await self.context.new_page()
+                try:
+                    results[i] = await self._visit(page, urls[i], keys[i], keep_raw)
+                except Exception as e:
+                    self.logger.error(f"Navigation failed for {urls[i]}: {str(e)}")
+                    raise
+                finally:
+                    await page.close()
+
+        await asyncio.gather(*(visit_one(i) for i in pending))
+        return results
+
+    async def _visit(self, page: Page, url: str, key: str, keep_raw: bool) -> Dict:
+        """Load url in page, cache the compressed result and return the caller-facing copy"""
+        # networkidle can hang on analytics beacons and long-polls long after the page has rendered;
+        # by default wait for the DOM, then give subresources a bounded window to finish loading
+        wait_strategy = WaitStrategy(self.config.wait_strategy)
+        response = await self._goto_with_retry(page, url, wait_strategy.value)
+        if wait_strategy is WaitStrategy.DOM_CONTENT_LOADED:
+            try:
+                await page.wait_for_load_state('load', timeout=LOAD_STATE_TIMEOUT_MS)
+            except PlaywrightTimeoutError:
+                self.logger.info(f"Load event not reached within {LOAD_STATE_TIMEOUT_MS}ms, continuing: {url}")
+
+        # Title, meta description and HTML in one CDP round-trip instead of three
+        page_info = await page.evaluate(PAGE_INFO_SCRIPT)
+
+        summary = await asyncio.to_thread(_summarize_html, page_info["html"])
+        page_data = {
+            "url": url,
+            "title": page_info["title"],
+            "description": page_info["description"],
+            "text": summary["text"],
+            "structure": summary["structure"],
+            "status_code": response.status if response else None,
+            "timestamp": None
+        }
+        # Memory and disk caches hold the compressed form; this caller gets the string it already has. Error
+        # pages (including the 429/5xx left once retries run out) are never cached, so the next clone tries again
+        if response and 200 <= response.status < 400:
+            self._remember_navigation(key, {**page_data, "html_zstd": summary["html_zstd"], "content_encoding": "zstd"})
+        page_data["html_content"] = page_info["html"] if keep_raw else None
+        return page_data
     
+    async def __aenter__(self) -> "ExplorerAgent":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.cleanup()
+
     async def cleanup(self):
-        """Cleanup browser resources"""
-        if self.browser:
-            await self.browser.close()
+        """Close this agent's context; the shared browser stays up for later requests"""
+        try:
+            if self.context:
+                context, self.context, self.page = self.context, None, None
+                await context.close()
+        finally:
+            self._release_permit()
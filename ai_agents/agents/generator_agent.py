@@ -1,27 +1,90 @@
 from config.system_config import SystemConfig, GeneratedProject
-from typing import Dict, List
+from agents._gemini_models import get_limiter, get_model, gemini_retrying
+from agents._files import write_files
+from agents._prompt_cache import PromptCache
+from typing import Dict, Final, FrozenSet, List, Tuple
+import asyncio
 import logging
 import os
 import time
-import json
 import shutil
 
+import orjson
+
+logging.basicConfig(level=logging.INFO)
+# Module-level so the lookup happens once; messages use lazy %-formatting
+logger = logging.getLogger("GeneratorAgent")
+
+
+def _strip_code_fence(text: str) -> str:
+    """Code inside a markdown-fenced reply: drops the opening fence line and everything from the closing fence"""
+    if not text.startswith('```'):
+        return text
+    _, _, body = text.partition('\n')
+    closing = body.rfind('```')
+    return (body[:closing] if closing != -1 else body).strip()
+
+
+# Minimal entry points added by generate_code when the analysis did not produce them
+_REACT_INDEX_JSX: Final[str] = "import React from 'react';\nimport ReactDOM from 'react-dom/client';\nimport App from './App';\nimport './index.css';\n\nReactDOM.createRoot(document.getElementById('root')).render(<App />);"
+_REACT_APP_JSX: Final[str] = "export default function App() {\n  return <div>Hello from App!</div>;\n}"
+_REACT_INDEX_HTML: Final[str] = "<!DOCTYPE html>\n<html lang='en'>\n  <head>\n    <meta charset='UTF-8' />\n    <meta name='viewport' content='width=device-width, initial-scale=1.0' />\n    <title>Cloned React App</title>\n  </head>\n  <body>\n    <div id='root'></div>\n  </body>\n</html>"
+_NEXT_APP_JS: Final[str] = "export default function MyApp({ Component, pageProps }) {\n  return <Component {...pageProps} />;\n}"
+_NEXT_INDEX_JS: Final[str] = "export default function Home() {\n  return <div>Hello from Next.js Home!</div>;\n}"
+_VUE_MAIN_JS: Final[str] = "import { createApp } from 'vue';\nimport App from './App.vue';\ncreateApp(App).mount('#app');"
+_VUE_APP_VUE: Final[str] = "<template>\n  <div>Hello from Vue App!</div>\n</template>\n<script>\nexport default { name: 'App' }\n</script>"
+_VUE_INDEX_HTML: Final[str] = "<!DOCTYPE html>\n<html lang='en'>\n  <head>\n    <meta charset='UTF-8' />\n    <meta name='viewport' content='width=device-width, initial-scale=1.0' />\n    <title>Cloned Vue App</title>\n  </head>\n  <body>\n    <div id='app'></div>\n  </body>\n</html>"
+_VANILLA_INDEX_HTML: Final[str] = "<!DOCTYPE html>\n<html lang='en'>\n  <head>\n    <meta charset='UTF-8' />\n    <meta name='viewport' content='width=device-width, initial-scale=1.0' />\n    <title>Cloned Vanilla App</title>\n  </head>\n  <body>\n    <h1>Hello from Vanilla JS!</h1>\n    <script src='main.js'></script>\n  </body>\n</html>"
+_VANILLA_MAIN_JS: Final[str] = "console.log('Hello from Vanilla JS!');"
+
 
 class GeneratorAgent:
     """
     Advanced Generator Agent that creates exact website clones based on analysis data.
     Supports React, Next.js, Vue, Angular, and vanilla HTML/CSS/JS.
     """
+
+    # Entry files every project of a framework needs: (basenames that satisfy it, path to add, content)
+    _FRAMEWORK_FALLBACKS: Dict[str, List[Tuple[FrozenSet[str], str, str]]] = {
+        "react": [
+            (frozenset({"index.js", "index.jsx"}), "src/index.jsx", _REACT_INDEX_JSX),
+            (frozenset({"app.js", "app.jsx"}), "src/App.jsx", _REACT_APP_JSX),
+            (frozenset({"index.html"}), "public/index.html", _REACT_INDEX_HTML)
+        ],
+        "next": [
+            (frozenset({"_app.js", "_app.jsx"}), "pages/_app.js", _NEXT_APP_JS),
+            (frozenset({"index.js", "index.jsx"}), "pages/index.js", _NEXT_INDEX_JS)
+        ],
+        "vue": [
+            (frozenset({"main.js"}), "src/main.js", _VUE_MAIN_JS),
+            (frozenset({"app.vue"}), "src/App.vue", _VUE_APP_VUE),
+            (frozenset({"index.html"}), "public/index.html", _VUE_INDEX_HTML)
+        ],
+        "vanilla": [
+            (frozenset({"index.html"}), "index.html", _VANILLA_INDEX_HTML),
+            (frozenset({"main.js"}), "main.js", _VANILLA_MAIN_JS)
+        ]
+    }
+    # Analysis-driven files: (file_type for the prompt, cloning_requirements list key, descriptions key)
+    _GENERATED_FILE_KINDS = (
+        ("component", "component_files", "components_description"),
+        ("page", "pages", "pages_description"),
+        ("style", "styles", "styles_description")
+    )
+    # Every basename some fallback checks for; other files cannot affect the fallbacks
+    _REQUIRED_BASENAMES: FrozenSet[str] = frozenset().union(
+        *(accepted for fallbacks in _FRAMEWORK_FALLBACKS.values() for accepted, _, _ in fallbacks)
+    )
     
     def __init__(self, config: SystemConfig):
         self.config = config
-        self.logger = self._setup_logger()
         self.project_templates = self._initialize_templates()
         self.component_generators = self._initialize_component_generators()
-    
-    def _setup_logger(self):
-        logging.basicConfig(level=logging.INFO)
-        return logging.getLogger(self.__class__.__name__)
+        # Same model instance as the analyzer; without a key _generate_real_code falls back to placeholders
+        self.model = get_model(config.gemini_api_key) if config.gemini_api_key else None
+        self._prompt_cache = PromptCache(config.output_dir)
+        self._gemini_limiter = get_limiter(config.gemini_rpm, config.gemini_tpm)
+        self._gemini_semaphore = asyncio.Semaphore(config.gemini_concurrency or 10)
     
     def _initialize_templates(self) -> Dict:
         """Initialize project templates for different frameworks"""
@@ -47,7 +110,7 @@ class GeneratorAgent:
         """
         Main method to generate complete website clone based on analysis
         """
-        self.logger.info("Starting code generation process...")
+        logger.info("Starting code generation process...")
         # Robust framework selection
         framework = "react"
         framework_dict = analysis.get("framework")
@@ -57,68 +120,42 @@ class GeneratorAgent:
                 framework = primary
         if not isinstance(framework, str) or not framework:
             framework = "react"
-        self.logger.info(f"Target framework: {framework}")
+        logger.info("Target framework: %s", framework)
         project_structure = {}
-        config_files = {}
+        requirements = analysis.get("cloning_requirements") or {}
         # Ensure package_json is always present
-        package_json = analysis.get("cloning_requirements", {}).get("package_json")
+        package_json = requirements.get("package_json")
         if not isinstance(package_json, dict) or not package_json:
             package_json = self._generate_package_json({}, framework)
-        assets = analysis.get("cloning_requirements", {}).get("assets", [])
-        build_commands = analysis.get("cloning_requirements", {}).get("build_commands", [])
-        dev_commands = analysis.get("cloning_requirements", {}).get("dev_commands", [])
-        deployment_config = analysis.get("cloning_requirements", {}).get("deployment_config", {})
-
-        # Dynamically create files/components as described by analysis
-        component_files = analysis.get("cloning_requirements", {}).get("component_files", [])
-        component_descriptions = analysis.get("components_description", {})
-        for file_name in component_files:
-            description = component_descriptions.get(file_name, "")
-            project_structure[file_name] = await self._generate_real_code(file_name, description, framework, file_type="component")
-
-        # Pages
-        page_files = analysis.get("cloning_requirements", {}).get("pages", [])
-        page_descriptions = analysis.get("pages_description", {})
-        for file_name in page_files:
-            description = page_descriptions.get(file_name, "")
-            project_structure[file_name] = await self._generate_real_code(file_name, description, framework, file_type="page")
-
-        # Styles
-        style_files = analysis.get("cloning_requirements", {}).get("styles", [])
-        style_descriptions = analysis.get("styles_description", {})
-        for file_name in style_files:
-            description = style_descriptions.get(file_name, "")
-            project_structure[file_name] = await self._generate_real_code(file_name, description, framework, file_type="style")
-
-        # Config files
-        config_files = analysis.get("cloning_requirements", {}).get("config_files", {})
+        assets = requirements.get("assets", [])
+        build_commands = requirements.get("build_commands", [])
+        dev_commands = requirements.get("dev_commands", [])
+        deployment_config = requirements.get("deployment_config", {})
+
+        # Dynamically create files/components as described by analysis; every file is independent, so
+        # components, pages and styles are generated concurrently (Gemini calls are capped in _generate_real_code)
+        jobs = []
+        for file_type, files_key, descriptions_key in self._GENERATED_FILE_KINDS:
+            # The analyzer nests descriptions under cloning_requirements; older analyses kept them top-level
+            descriptions = requirements.get(descriptions_key) or analysis.get(descriptions_key) or {}
+            jobs.extend((file_name, descriptions.get(file_name, ""), file_type)
+                        for file_name in requirements.get(files_key, []))
+        results = await asyncio.gather(*(
+            self._generate_real_code(file_name, description, framework, file_type=file_type)
+            for file_name, description, file_type in jobs
+        ))
+        # Later jobs win on duplicate names, as with the previous sequential loops
+        project_structure.update(zip((file_name for file_name, _, _ in jobs), results))
+
+        # Config files; copied because the defaults below must not leak into a cached analysis
+        config_files = dict(requirements.get("config_files", {}))
 
         # Fallback: Add minimal templates if missing
-        if framework == "react":
-            if not any(f for f in project_structure if f.lower().endswith("index.js") or f.lower().endswith("index.jsx")):
-                project_structure["src/index.jsx"] = "import React from 'react';\nimport ReactDOM from 'react-dom/client';\nimport App from './App';\nimport './index.css';\n\nReactDOM.createRoot(document.getElementById('root')).render(<App />);"
-            if not any(f for f in project_structure if f.lower().endswith("app.js") or f.lower().endswith("app.jsx")):
-                project_structure["src/App.jsx"] = "export default function App() {\n  return <div>Hello from App!</div>;\n}"
-            if not any(f for f in project_structure if f.lower().endswith("index.html")):
-                project_structure["public/index.html"] = "<!DOCTYPE html>\n<html lang='en'>\n  <head>\n    <meta charset='UTF-8' />\n    <meta name='viewport' content='width=device-width, initial-scale=1.0' />\n    <title>Cloned React App</title>\n  </head>\n  <body>\n    <div id='root'></div>\n  </body>\n</html>"
-        elif framework == "next":
-            if not any(f for f in project_structure if f.lower().endswith("_app.js") or f.lower().endswith("_app.jsx")):
-                project_structure["pages/_app.js"] = "export default function MyApp({ Component, pageProps }) {\n  return <Component {...pageProps} />;\n}"
-            if not any(f for f in project_structure if f.lower().endswith("index.js") or f.lower().endswith("index.jsx")):
-                project_structure["pages/index.js"] = "export default function Home() {\n  return <div>Hello from Next.js Home!</div>;\n}"
-        elif framework == "vue":
-            if not any(f for f in project_structure if f.lower().endswith("main.js")):
-                project_structure["src/main.js"] = "import { createApp } from 'vue';\nimport App from './App.vue';\ncreateApp(App).mount('#app');"
-            if not any(f for f in project_structure if f.lower().endswith("app.vue")):
-                project_structure["src/App.vue"] = "<template>\n  <div>Hello from Vue App!</div>\n</template>\n<script>\nexport default { name: 'App' }\n</script>"
-            if not any(f for f in project_structure if f.lower().endswith("index.html")):
-                project_structure["public/index.html"] = "<!DOCTYPE html>\n<html lang='en'>\n  <head>\n    <meta charset='UTF-8' />\n    <meta name='viewport' content='width=device-width, initial-scale=1.0' />
-    <title>Cloned Vue App</title>\n  </head>\n  <body>\n    <div id='app'></div>\n  </body>\n</html>"
-        elif framework == "vanilla":
-            if not any(f for f in project_structure if f.lower().endswith("index.html")):
-                project_structure["index.html"] = "<!DOCTYPE html>\n<html lang='en'>\n  <head>\n    <meta charset='UTF-8' />\n    <meta name='viewport' content='width=device-width, initial-scale=1.0' />\n    <title>Cloned Vanilla App</title>\n  </head>\n  <body>\n    <h1>Hello from Vanilla JS!</h1>\n    <script src='main.js'></script>\n  </body>\n</html>"
-            if not any(f for f in project_structure if f.lower().endswith("main.js")):
-                project_structure["main.js"] = "console.log('Hello from Vanilla JS!');"
+        required = self._REQUIRED_BASENAMES
+        basenames = {name for name in (os.path.basename(f).lower() for f in project_structure) if name in required}
+        for accepted, target_path, content in self._FRAMEWORK_FALLBACKS.get(framework, ()):
+            if basenames.isdisjoint(accepted):
+                project_structure[target_path] = content
 
         # Ensure .gitignore is always present
         if ".gitignore" not in config_files and ".gitignore" not in project_structure:
@@ -130,7 +167,7 @@ class GeneratorAgent:
 
         # Ensure package.json is always present in config_files
         if "package.json" not in config_files and package_json:
-            config_files["package.json"] = json.dumps(package_json, indent=2)
+            config_files["package.json"] = orjson.dumps(package_json, option=orjson.OPT_INDENT_2).decode()
 
         generated_project = GeneratedProject(
             framework=framework,
@@ -145,7 +182,7 @@ class GeneratorAgent:
 
         # Save in a nested project folder inside cloned_sites
         await self._save_project(generated_project, subdir="project")
-        self.logger.info("Code generation completed successfully")
+        logger.info("Code generation completed successfully")
         return generated_project
 
     async def _save_project(self, generated_project: GeneratedProject, subdir: str = "") -> None:
@@ -154,27 +191,21 @@ class GeneratorAgent:
         project_name = f"cloned_{generated_project.framework}_{timestamp}"
         base_dir = os.path.join(self.config.output_dir, project_name)
         output_dir = os.path.join(base_dir, subdir) if subdir else base_dir
-        os.makedirs(output_dir, exist_ok=True)
-        for file_path, content in generated_project.project_structure.items():
-            abs_path = os.path.join(output_dir, file_path)
-            os.makedirs(os.path.dirname(abs_path), exist_ok=True)
-            with open(abs_path, "w", encoding="utf-8") as f:
-                f.write(content)
-        # Save package.json if present
-        if generated_project.package_json:
-            with open(os.path.join(output_dir, "package.json"), "w", encoding="utf-8") as f:
-                f.write(json.dumps(generated_project.package_json, indent=2))
+        # Keyed by path so config files replace same-named project files instead of racing them
+        targets = {os.path.join(output_dir, file_path): content
+                   for file_path, content in generated_project.project_structure.items()}
         # Save config files if present
         for file_path, content in generated_project.config_files.items():
-            abs_path = os.path.join(output_dir, file_path)
-            os.makedirs(os.path.dirname(abs_path), exist_ok=True)
-            with open(abs_path, "w", encoding="utf-8") as f:
-                if isinstance(content, dict):
-                    f.write(json.dumps(content, indent=2))
-                else:
-                    f.write(str(content))
-        self.logger.info(f"Project saved to {output_dir}")
-    
+            targets[os.path.join(output_dir, file_path)] = content
+        # generate_code already serialized package.json into config_files; only projects built elsewhere
+        # still need it written from the dict
+        if generated_project.package_json and "package.json" not in generated_project.config_files:
+            logger.debug("package.json missing from config_files, writing it from package_json")
+            targets.setdefault(os.path.join(output_dir, "package.json"), generated_project.package_json)
+        os.makedirs(output_dir, exist_ok=True)
+        await write_files(targets)
+        logger.info("Project saved to %s", output_dir)
+
     def _determine_framework(self, analysis: Dict, target_framework: str = None) -> str:
         """Determine the best framework for the project"""
         if target_framework:
@@ -201,7 +232,7 @@ class GeneratorAgent:
         components = {}
         component_list = analysis.get("components", [])
         
-        self.logger.info(f"Generating {len(component_list)} components for {framework}")
+        logger.info("Generating %d components for %s", len(component_list), framework)
         
         for component_name in component_list:
             component_code = await self._generate_single_component(
@@ -2840,15 +2871,25 @@ Do not use any UI libraries or icon sets other than Tailwind CSS and lucide-reac
 Do not include any explanations, only the code.
 """
         if self.model:
+            cache_key = PromptCache.key("code", framework, self.model.model_name, prompt)
+            cached = self._prompt_cache.get(cache_key)
+            if cached is not None:
+                logger.info("Using cached generation for %s", file_name)
+                return cached
             try:
-                response = await self.model.generate_content_async(prompt)
-                code = response.text.strip()
-                # Remove markdown code block if present
-                if code.startswith('```'):
-                    code = code.split('```', 2)[-1].strip()
-                return code
+                async for attempt in gemini_retrying(logger, self._gemini_limiter):
+                    with attempt:
+                        await self._gemini_limiter.acquire(prompt)
+                        async with self._gemini_semaphore:
+                            response = await self.model.generate_content_async(prompt)
+                code = _strip_code_fence(response.text.strip())
+                # An empty reply is a failure, not an answer: fall through to the placeholder and ask again next time
+                if code:
+                    self._prompt_cache.set(cache_key, code, expire=self.config.prompt_cache_ttl_seconds)
+                    return code
+                logger.warning("Gemini returned no code for %s", file_name)
             except Exception as e:
-                self.logger.warning(f"Gemini code generation failed for {file_name}: {e}")
+                logger.warning("Gemini code generation failed for %s: %s", file_name, e)
         # Fallback: placeholder
         ext = os.path.splitext(file_name)[1]
         if ext in ['.js', '.jsx', '.ts', '.tsx']:
@@ -2,7 +2,7 @@ from config.system_config import SystemConfig
 from playwright.async_api import Page
 from pathlib import Path
 import logging
-from typing import Dict
+from typing import Dict, Optional, Union
 
 class ScreenshotAgent:
     def __init__(self, config: SystemConfig):
@@ -13,9 +13,13 @@ class ScreenshotAgent:
         logging.basicConfig(level=logging.INFO)
         return logging.getLogger(self.__class__.__name__)
     
-    async def capture_full_page(self, page: Page, output_path: str) -> str:
-        """Capture full page screenshot"""
+    async def capture_full_page(self, page: Page, output_path: Optional[str] = None) -> Union[str, bytes]:
+        """Capture full page screenshot; without an output path the PNG bytes are returned instead"""
         try:
+            if output_path is None:
+                # In-memory capture for consumers that decode directly (e.g. DetectorAgent)
+                return await page.screenshot(full_page=True, type='png')
+            
             # Ensure output directory exists
             Path(output_path).parent.mkdir(parents=True, exist_ok=True)
             await page.screenshot(path=output_path, full_page=True)
@@ -1,5 +1,5 @@
 from config.system_config import SystemConfig, CloneResult, GeneratedProject
-from agents.explorer_agent import ExplorerAgent
+from agents.explorer_agent import ExplorerAgent, BrowserBusyError
 from agents.screenshot_agent import ScreenshotAgent
 from agents.analyzer_agent import AnalyzerAgent
 from agents.generator_agent import GeneratorAgent
@@ -8,13 +8,13 @@ from fastapi import HTTPException
 from datetime import datetime
 from typing import Dict
 import os
-from typing import Dict
+import asyncio
+from pathlib import Path
 
 class WebsiteCloneOrchestrator:
     def __init__(self, config: SystemConfig):
         self.config = config
         self.logger = self._setup_logger()
-        self.explorer = ExplorerAgent(config)
         self.screenshot_agent = ScreenshotAgent(config)
         self.analyzer = AnalyzerAgent(config)
         self.generator = GeneratorAgent(config)
@@ -29,19 +29,34 @@ class WebsiteCloneOrchestrator:
         """Main cloning pipeline"""
         start_time = datetime.now()
         
+        save_task = None
         try:
             # Step 1: Explore and capture
             self.logger.info(f"Starting clone process for: {url}")
-            page_data = await self.explorer.navigate_to_url(url)
-            
-            # Step 2: Screenshot
+            # Non-blocking callers give up on a browser slot after permit_timeout_ms instead of queueing
+            permit_timeout_ms = options.get('permit_timeout_ms')
+            permit_timeout = permit_timeout_ms / 1000 if permit_timeout_ms is not None else None
             timestamp = int(start_time.timestamp())
             screenshot_path = f"{getattr(self.config, 'output_dir', 'generated_project')}/original_{timestamp}.png"
-            await self.screenshot_agent.capture_full_page(self.explorer.page, screenshot_path)
+            # Page/context state is per request, so each call gets its own explorer; leaving the block closes
+            # its context and frees the browser slot however the capture ends
+            async with ExplorerAgent(self.config) as explorer:
+                page_data = await explorer.navigate_to_url(url, permit_timeout=permit_timeout)
+
+                # Step 2: Screenshot, kept in memory for the analyzer and detector
+                raw_png = page_data.get("screenshot")
+                if raw_png is None:
+                    if explorer.page is None:
+                        # Cached navigation from a run that never reached the screenshot; load the page for real
+                        page_data = await explorer.navigate_to_url(url, use_cache=False, permit_timeout=permit_timeout)
+                    raw_png = await self.screenshot_agent.capture_full_page(explorer.page)
+                    explorer.cache_screenshot(url, raw_png)
+            # The on-disk copy is only for inspection, so it is written off the critical path
+            save_task = asyncio.create_task(asyncio.to_thread(self._save_screenshot, screenshot_path, raw_png))
             
             # Step 3: Analyze
             self.logger.info("Analyzing website structure...")
-            analysis = await self.analyzer.analyze_screenshot(screenshot_path, page_data["html_content"])
+            analysis = await self.analyzer.analyze_screenshot(raw_png, page_data["html_content"])
             
             # Step 4: Generate code
             self.logger.info("Generating code...")
@@ -51,22 +66,17 @@ class WebsiteCloneOrchestrator:
             if not self._validate_generated_code(generated_project):
                 raise HTTPException(status_code=400, detail="Generated code validation failed")
             
-            # Step 6: Compare visual similarity
+            # Steps 6 and 7 both only need the generated site, so run them together
             generated_url = options.get('generated_url', 'http://localhost:3000')
             generated_screenshot = f"{getattr(self.config, 'output_dir', 'generated_project')}/generated_{timestamp}.png"
-            if hasattr(self.screenshot_agent, 'capture_full_page_url'):
-                await self.screenshot_agent.capture_full_page_url(generated_url, generated_screenshot)
-                similarity_score = await self.detector.validate_similarity(screenshot_path, generated_screenshot)
-            else:
-                similarity_score = 0.0
-            
-            # Step 7: Run Lighthouse audit (optional)
-            lighthouse_score = await self._run_lighthouse_audit(generated_url) if options.get('run_lighthouse', False) else None
+            similarity_score, lighthouse_score = await asyncio.gather(
+                self._similarity_for(raw_png, generated_url, generated_screenshot),
+                self._run_lighthouse_audit(generated_url) if options.get('run_lighthouse', False) else self._no_audit()
+            )
             
             generation_time = (datetime.now() - start_time).total_seconds()
             
-            # Cleanup
-            await self.explorer.cleanup()
+            await save_task
             
             self.logger.info(f"Clone process completed in {generation_time:.2f} seconds")
             
@@ -77,10 +87,29 @@ class WebsiteCloneOrchestrator:
                 lighthouse_score=lighthouse_score
             )
             
+        except BrowserBusyError as e:
+            self.logger.warning(f"Clone rejected: {str(e)}")
+            raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
         except Exception as e:
             self.logger.error(f"Clone process failed: {str(e)}")
-            await self.explorer.cleanup()
+            if save_task is not None:
+                await asyncio.gather(save_task, return_exceptions=True)
             raise HTTPException(status_code=500, detail=str(e))
+
+    async def _similarity_for(self, original: bytes, generated_url: str, generated_screenshot: str) -> float:
+        """Step 6: capture the generated site and compare it with the original screenshot"""
+        if not hasattr(self.screenshot_agent, 'capture_full_page_url'):
+            return 0.0
+        await self.screenshot_agent.capture_full_page_url(generated_url, generated_screenshot)
+        return await self.detector.validate_similarity(original, generated_screenshot)
+
+    @staticmethod
+    def _save_screenshot(path: str, data: bytes) -> None:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        Path(path).write_bytes(data)
+
+    async def _no_audit(self) -> None:
+        return None
     
     def _validate_generated_code(self, generated_project: GeneratedProject) -> bool:
         """Validate the generated code for completeness and correctness"""
@@ -1,8 +1,15 @@
 from dataclasses import dataclass
-from typing import Dict, List, Optional
+from enum import Enum
+from typing import Dict, List, Optional, Tuple
 import os
 from pydantic import BaseModel
 
+class WaitStrategy(str, Enum):
+    """Playwright wait_until used when loading the page to clone"""
+    DOM_CONTENT_LOADED = "domcontentloaded"
+    LOAD = "load"
+    NETWORK_IDLE = "networkidle"
+
 @dataclass
 class SystemConfig:
     gemini_api_key: str = os.getenv("GEMINI_API_KEY", "")
@@ -12,6 +19,22 @@ class SystemConfig:
     screenshot_width: int = 1920
     screenshot_height: int = 1080
     similarity_threshold: float = 0.7
+    gemini_concurrency: int = 10
+    # Project-wide Gemini quota, defaulting to the free tier; raise both for paid projects. Each of the
+    # WEB_CONCURRENCY worker processes enforces an equal share of it
+    gemini_rpm: int = int(os.getenv("GEMINI_RPM", "15"))
+    gemini_tpm: int = int(os.getenv("GEMINI_TPM", "1000000"))
+    nav_cache_size: int = 16
+    nav_cache_ttl_seconds: int = 600
+    # Lifetime of persisted Gemini analyses and generated code, so model-side improvements eventually show up
+    prompt_cache_ttl_seconds: int = 7 * 24 * 3600
+    max_concurrent_browsers: int = int(os.getenv("MAX_CONCURRENT_BROWSERS", "4"))
+    permit_timeout_ms: int = 100
+    # JS-heavy sites that render after the load event can opt back into NETWORK_IDLE
+    wait_strategy: WaitStrategy = WaitStrategy.DOM_CONTENT_LOADED
+    # Playwright resource types aborted during navigation; images, fonts and stylesheets stay because the
+    # screenshot drives the analysis, but screenshot-free callers can add them
+    block_resource_types: Tuple[str, ...] = ("media",)
 
 class CloneRequest(BaseModel):
     url: str
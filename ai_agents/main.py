@@ -25,11 +25,15 @@ import requests
 from pathlib import Path
 
 # FastAPI for API wrapper
-from fastapi import FastAPI, HTTPException
+import anyio
+from fastapi import Depends, FastAPI, HTTPException, Response
+from fastapi.responses import ORJSONResponse
+import orjson
 from pydantic import BaseModel
 from logging.handlers import RotatingFileHandler
 from config.system_config import SystemConfig, CloneRequest, CloneResult
 from agents.website_clone import WebsiteCloneOrchestrator
+from agents.explorer_agent import ExplorerAgent
 
 def setup_logging(log_file: str = "website_clone.log", log_level: int = logging.INFO) -> None:
     """
@@ -97,7 +101,8 @@ if __name__ == "__main__":
     })
 
 # FastAPI Application
-app = FastAPI(title="AI Website Cloning System", version="1.0.0")
+# Response models are dumped by pydantic-core and rendered by orjson instead of the stdlib json encoder
+app = FastAPI(title="AI Website Cloning System", version="1.0.0", default_response_class=ORJSONResponse)
 
 # Global config (would be loaded from environment)
 config = SystemConfig(
@@ -105,40 +110,92 @@ config = SystemConfig(
     firebase_project_id=os.getenv("FIREBASE_PROJECT_ID", "demo-project")
 )
 
+# Threadpool tokens for sync dependencies/handlers; anyio's default of 40 would cap concurrent requests
+ANYIO_THREAD_TOKENS = int(os.getenv("ANYIO_TOKENS", "100"))
+
+def get_orchestrator() -> WebsiteCloneOrchestrator:
+    """Orchestrator built once at startup and shared by all requests"""
+    return app.state.orchestrator
+
 @app.post("/clone", response_model=CloneResult)
-async def clone_website(request: CloneRequest):
-    """Clone a website endpoint"""
+async def clone_website(request: CloneRequest, non_blocking: bool = False,
+                        orchestrator: WebsiteCloneOrchestrator = Depends(get_orchestrator)):
+    """Clone a website endpoint; with non_blocking=true a busy server answers 429 instead of queueing"""
     try:
-        orchestrator = WebsiteCloneOrchestrator(config)
+        options = request.options
+        if non_blocking:
+            options = {**options, "permit_timeout_ms": config.permit_timeout_ms}
         return await orchestrator.clone_website(
             request.url, 
             request.framework, 
-            request.options
+            options
         )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.on_event("startup")
+async def startup():
+    """Build the shared orchestrator and pay the Chromium launch cost once at boot"""
+    anyio.to_thread.current_default_thread_limiter().total_tokens = ANYIO_THREAD_TOKENS
+    app.state.orchestrator = WebsiteCloneOrchestrator(config)
+    await ExplorerAgent.startup()
+
+@app.on_event("shutdown")
+async def shutdown_browser():
+    """Close the Playwright browser shared by all clone requests"""
+    await ExplorerAgent.shutdown()
+
+# Static payloads, serialized once at import
+ROOT_JSON = orjson.dumps({
+    "message": "AI Website Cloning System",
+    "version": "1.0.0",
+    "endpoints": {
+        "clone": "POST /clone",
+        "health": "GET /health"
+    }
+})
+HEALTH_JSON_PREFIX = b'{"status":"healthy","timestamp":"'
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
-    return {"status": "healthy", "timestamp": datetime.now().isoformat()}
+    return Response(content=HEALTH_JSON_PREFIX + datetime.now().isoformat().encode() + b'"}',
+                    media_type="application/json")
 
 @app.get("/")
 async def root():
     """Root endpoint with API information"""
-    return {
-        "message": "AI Website Cloning System",
-        "version": "1.0.0",
-        "endpoints": {
-            "clone": "POST /clone",
-            "health": "GET /health"
-        }
-    }
+    return Response(content=ROOT_JSON, media_type="application/json")
 
 if __name__ == "__main__":
+    import copy
     import uvicorn
+    from uvicorn.config import LOGGING_CONFIG
     
     # Ensure output directory exists
     os.makedirs(config.output_dir, exist_ok=True)
     
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    # Exported so every worker sees the count and takes its share of the Gemini quota (see get_limiter)
+    workers = int(os.getenv("WEB_CONCURRENCY", str(max(2, (os.cpu_count() or 2) // 2))))
+    os.environ["WEB_CONCURRENCY"] = str(workers)
+    
+    # Server messages at WARNING while uvicorn.access keeps its one INFO line per request. log_level would
+    # set the access logger to the same level, so the levels live in the logging config instead
+    log_config = copy.deepcopy(LOGGING_CONFIG)
+    log_config["loggers"]["uvicorn"]["level"] = "WARNING"
+    log_config["loggers"]["uvicorn.error"]["level"] = "WARNING"
+    
+    # uvloop/httptools keep the event loop cheap under Playwright's CDP websocket traffic. Each worker is
+    # its own process with its own Chromium and browser permits; in production run the same app via
+    # gunicorn -k uvicorn.workers.UvicornWorker -w <2n+1> --preload, with WEB_CONCURRENCY set to the same count.
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=8000,
+        loop="uvloop",
+        http="httptools",
+        workers=workers,
+        log_config=log_config
+    )
\ No newline at end of file